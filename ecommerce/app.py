@@ -4,7 +4,11 @@ Main E-commerce Brazil Dashboard with Viridis Theme - CORREGIDO
 import streamlit as st
 import sqlite3
 from data_loader import data_loader
+from utils.perf import perf
+from utils.prefetch import prefetcher
+from config.performance_config import PREFETCH_ENABLED
 import components as comp
+from components.filters import show_filters
 
 # Page configuration
 st.set_page_config(
@@ -63,6 +67,9 @@ selected_analysis = st.sidebar.radio(
     list(analysis_options.keys())
 )
 
+# Sidebar - Global filters, drawn once the database is available
+filters_container = st.sidebar.container()
+
 # Sidebar - Project information
 st.sidebar.markdown("---")
 st.sidebar.header("ℹ️ About")
@@ -79,15 +86,50 @@ if 'db_loaded' not in st.session_state:
 if selected_analysis in analysis_options:
     analysis_function = analysis_options[selected_analysis]
     
-    # Create a new connection for this thread
-    conn = data_loader.create_connection()
+    # Borrow a pooled read-only connection for this thread
+    conn = None
+    filters = None
     try:
-        analysis_function(conn)
+        conn = data_loader.get_connection()
+        with filters_container:
+            filters = show_filters(conn)
+        with perf.section(selected_analysis):
+            analysis_function(conn, filters)
     except Exception as e:
         st.error(f"Error in analysis: {str(e)}")
         st.info("Please check the database connection and try again.")
     finally:
-        conn.close()
+        if conn is not None:
+            data_loader.release_connection(conn)
+
+# Warm the other sections in the background now that this one is on screen
+if PREFETCH_ENABLED:
+    try:
+        prefetcher.schedule(
+            data_loader,
+            [function for name, function in analysis_options.items() if name != selected_analysis],
+            filters
+        )
+    except (OSError, sqlite3.Error):
+        pass  # prefetching is best effort
+
+# Sidebar - Connection and cache settings
+with st.sidebar.expander("⚙️ Performance"):
+    try:
+        st.json(data_loader.connection_report(), expanded=False)
+    except (OSError, sqlite3.Error) as e:
+        st.caption(f"Report unavailable: {str(e)}")
+
+# Sidebar - Timing breakdown (optional)
+if st.sidebar.checkbox("⏱️ Show timings", value=False):
+    with st.sidebar.expander("⏱️ Timings", expanded=True):
+        last_run = perf.last_run(selected_analysis)
+        if last_run:
+            st.caption(f"Last render: {last_run['seconds'] * 1000:,.1f} ms")
+        st.markdown("**Sections (rolling p50/p95)**")
+        st.dataframe(perf.section_summary(), hide_index=True)
+        st.markdown(f"**{selected_analysis} operations**")
+        st.dataframe(perf.operation_summary(selected_analysis), hide_index=True)
 
 # Footer
 st.markdown("---")
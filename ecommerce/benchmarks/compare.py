@@ -0,0 +1,176 @@
+"""
+Regression gate: compare a benchmark run against a stored baseline
+
+Run from the ecommerce/ directory:
+    python -m benchmarks.run --output benchmarks/baseline.json      # once
+    python -m benchmarks.compare benchmarks/baseline.json           # rerun and compare
+    python -m benchmarks.compare benchmarks/baseline.json --current after.json
+
+Without --current the suite is rerun on the baseline's datasets with the
+same repeat counts. A benchmark regresses when its median slows down by more
+than BENCH_REGRESSION_PCT for its kind, by more than the noise (the sum of
+the two runs' IQRs) and by more than BENCH_MIN_DELTA_MS. Runs with fewer than
+BENCH_MIN_REPEAT query/figure samples are refused: with three samples an
+unchanged tree can show up as regressed. When the suite is rerun and
+something regresses, it is run once more and each benchmark keeps its faster
+run, so a single noisy pass does not fail the gate. A baseline
+benchmark missing from the new run (renamed, removed or crashed) fails the
+gate too unless it is listed with --allow-missing. Exits with status 1 if
+anything regressed or went missing, 2 if the runs are too short to compare.
+"""
+import argparse
+import json
+import sys
+
+from config.performance_config import BENCH_REGRESSION_PCT, BENCH_MIN_DELTA_MS, BENCH_MIN_REPEAT
+from benchmarks.run import dataset_dir, print_summary, run_suite, save_results
+
+# Metadata that should match for timings to be comparable
+COMPARABLE_METADATA = ('machine', 'cpu_count', 'python', 'sqlite', 'pandas', 'plotly')
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def rerun(baseline):
+    """Run the suite again on the datasets and settings of the baseline"""
+    source_dirs = {}
+    for label, dataset in baseline['datasets'].items():
+        if label.startswith('scale-'):
+            source_dirs[label] = dataset_dir(float(label[len('scale-'):]), baseline.get('seed') or 0)
+        else:
+            source_dirs[label] = dataset['source_dir']
+    return run_suite(source_dirs, baseline['repeat'], baseline['ingest_repeat'], seed=baseline.get('seed'))
+
+
+def keep_fastest(first, second):
+    """Results document with, per benchmark, whichever run had the lower median"""
+    merged = json.loads(json.dumps(first))
+    for label, dataset in merged['datasets'].items():
+        other = second['datasets'].get(label, {}).get('results', {})
+        for name, stats in dataset['results'].items():
+            if name in other and other[name]['median'] < stats['median']:
+                dataset['results'][name] = other[name]
+    return merged
+
+
+def noise_band(base, current):
+    """Run-to-run noise of a benchmark: the IQRs of both runs added up"""
+    return base['iqr'] + current['iqr']
+
+
+def classify(name, base, current, thresholds=BENCH_REGRESSION_PCT, min_delta_ms=BENCH_MIN_DELTA_MS):
+    """Status of one benchmark: ok, REGRESSED or improved, plus the % change"""
+    kind = name.split(':', 1)[0]
+    limit = thresholds.get(kind, max(thresholds.values()))
+    delta = current['median'] - base['median']
+    change = delta / base['median'] * 100 if base['median'] else 0.0
+    noise = noise_band(base, current)
+    significant = abs(delta) > noise and abs(delta) * 1000 > min_delta_ms
+    if significant and change > limit:
+        return 'REGRESSED', change
+    if significant and change < -limit:
+        return 'improved', change
+    return 'ok', change
+
+
+def compare(baseline, current, allow_missing=()):
+    """Rows of (dataset, benchmark, base ms, current ms, change %, noise ms, status)"""
+    rows = []
+    for label, dataset in baseline['datasets'].items():
+        current_results = current['datasets'].get(label, {}).get('results', {})
+        for name, base in dataset['results'].items():
+            if name not in current_results:
+                status = 'removed' if name in allow_missing else 'MISSING'
+                rows.append((label, name, base['median'] * 1000, None, None, None, status))
+                continue
+            now = current_results[name]
+            status, change = classify(name, base, now)
+            noise = noise_band(base, now) * 1000
+            rows.append((label, name, base['median'] * 1000, now['median'] * 1000, change, noise, status))
+        for name in current_results.keys() - dataset['results'].keys():
+            rows.append((label, name, None, current_results[name]['median'] * 1000, None, None, 'new'))
+    return rows
+
+
+def print_table(rows):
+    fmt = lambda value, spec: format('-', f'>{len(format(0, spec))}') if value is None else format(value, spec)
+    header = f"{'dataset':<14} {'benchmark':<58} {'base ms':>10} {'now ms':>10} {'change':>8} {'noise':>8}  status"
+    print(header)
+    print('-' * len(header))
+    for label, name, base, now, change, noise, status in rows:
+        print(
+            f"{label:<14} {name:<58} {fmt(base, '10.2f')} {fmt(now, '10.2f')} "
+            f"{fmt(change, '+7.1f') + ('%' if change is not None else ''):>8} {fmt(noise, '8.2f')}  {status}"
+        )
+
+
+def warn_if_incomparable(baseline, current):
+    differences = [
+        f"{key}: {baseline['metadata'].get(key)} -> {current['metadata'].get(key)}"
+        for key in COMPARABLE_METADATA
+        if baseline['metadata'].get(key) != current['metadata'].get(key)
+    ]
+    if differences:
+        print("Warning: runs come from different environments; timings may not be comparable:")
+        for difference in differences:
+            print(f"  {difference}")
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when benchmarks regress against a baseline")
+    parser.add_argument('baseline', help="results file to compare against")
+    parser.add_argument('--current', help="existing results file; by default the suite is rerun")
+    parser.add_argument('--save', help="also write the rerun results to this file")
+    parser.add_argument(
+        '--allow-missing', action='append', default=[], metavar='BENCHMARK',
+        help="baseline benchmark that may be absent from the new run (repeatable)"
+    )
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    if baseline['repeat'] < BENCH_MIN_REPEAT:
+        print(f"Baseline has {baseline['repeat']} samples per benchmark; rerun it with "
+              f"--repeat {BENCH_MIN_REPEAT} or more to compare against it")
+        return 2
+    if args.current:
+        current = load_results(args.current)
+        if current['repeat'] < BENCH_MIN_REPEAT:
+            print(f"{args.current} has {current['repeat']} samples per benchmark; "
+                  f"at least {BENCH_MIN_REPEAT} are needed to compare")
+            return 2
+    else:
+        current = rerun(baseline)
+        if args.save:
+            save_results(current, args.save)
+        print_summary(current)
+        print()
+
+    warn_if_incomparable(baseline, current)
+    rows = compare(baseline, current, allow_missing=set(args.allow_missing))
+    if not args.current and any(row[-1] == 'REGRESSED' for row in rows):
+        print("Regressions found; running the suite again to confirm them\n")
+        current = keep_fastest(current, rerun(baseline))
+        if args.save:
+            save_results(current, args.save)
+        rows = compare(baseline, current, allow_missing=set(args.allow_missing))
+    print_table(rows)
+
+    regressed = [row for row in rows if row[-1] == 'REGRESSED']
+    missing = [row for row in rows if row[-1] == 'MISSING']
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed beyond the configured thresholds")
+    if missing:
+        print(f"\n{len(missing)} baseline benchmark(s) missing from this run; "
+              f"pass --allow-missing for ones removed on purpose")
+    if regressed or missing:
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
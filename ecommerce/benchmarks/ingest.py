@@ -0,0 +1,64 @@
+"""
+One ingestion sample, run in a fresh process so peak RSS belongs to the load
+
+    python -m benchmarks.ingest --source-dir data/synthetic --db /tmp/bench.db
+
+Prints a JSON object with seconds, rows loaded, rows/s and peak RSS.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from data_loader import DataLoader
+from utils.download_cache import DownloadCache
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time one cold DataLoader.build_database run")
+    parser.add_argument('--source-dir', required=True)
+    parser.add_argument('--db', required=True)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    loader = DataLoader(db_name=args.db, source_dir=args.source_dir)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Cold cache: source hashes are computed as part of the sample
+        loader.download_cache = DownloadCache(cache_dir=cache_dir)
+        start = time.perf_counter()
+        summary = loader.build_database()
+        seconds = time.perf_counter() - start
+
+    conn = sqlite3.connect(args.db)
+    try:
+        manifest = loader.read_manifest(conn)
+    finally:
+        conn.close()
+    rows = sum(row['row_count'] for table, row in manifest.items() if table in loader.file_urls)
+    print(json.dumps({
+        'seconds': seconds,
+        'rows': rows,
+        'rows_per_s': rows / seconds if seconds else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'failed': summary['failed']
+    }))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Concurrent-session load test for app.py using Streamlit's headless AppTest driver
+
+Run from the ecommerce/ directory on Linux:
+    python -m benchmarks.load_test --sessions 50 200 --steps 12 --scale 0.1
+
+Every simulated session is an AppTest instance on its own thread, all in one
+process like a Streamlit server. Sessions click through the sidebar sections in
+a seeded random order and move the product sliders when they land on Product
+Analysis. Each concurrency level reports per-section latency percentiles,
+reruns per second, pool wait (time spent in DataLoader.get_connection taking a
+pooled connection or opening one), SQLite "locked"/"busy" errors and resident
+memory growth.
+
+Running sessions concurrently relies on AppTest internals (see shared_runtime),
+so only the Streamlit versions in SUPPORTED_STREAMLIT are accepted.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import streamlit
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import AppTest, app_test
+
+import data_loader as data_loader_module
+from config.gdrive_config import get_local_paths
+from benchmarks.run import dataset_dir, machine_metadata, DATA_DIR
+from utils.perf import percentile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+PRODUCT_SECTION = "📦 Product Analysis"
+# [min, max) Streamlit versions whose AppTest looks up Runtime through
+# streamlit.testing.v1.app_test and keeps the instance in Runtime._instance
+SUPPORTED_STREAMLIT = ((1, 37), (2, 0))
+
+
+def current_rss_mb():
+    """Resident set size of this process from /proc (Linux), else None"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class MemorySampler(threading.Thread):
+    """Samples RSS in the background and keeps the peak"""
+
+    def __init__(self, interval=0.25):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.start_mb = current_rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+                self.peak_mb = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return current_rss_mb()
+
+
+class PoolWaits:
+    """Wraps DataLoader.get_connection to time how long sessions wait on the pool"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.samples = []
+        self._original = loader.get_connection
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        def timed_get_connection():
+            start = time.perf_counter()
+            try:
+                return self._original()
+            finally:
+                with self._lock:
+                    self.samples.append(time.perf_counter() - start)
+        self.loader.get_connection = timed_get_connection
+        return self
+
+    def __exit__(self, *exc):
+        del self.loader.get_connection
+        return False
+
+
+def check_streamlit_version(version=streamlit.__version__):
+    """Raise unless shared_runtime's patch is known to work on this Streamlit"""
+    parsed = tuple(int(part) for part in version.split('.')[:2] if part.isdigit())
+    low, high = SUPPORTED_STREAMLIT
+    if not low <= parsed < high or not hasattr(app_test, 'Runtime') or not hasattr(Runtime, '_instance'):
+        raise RuntimeError(
+            f"benchmarks.load_test supports Streamlit {'.'.join(map(str, low))} up to "
+            f"{'.'.join(map(str, high))} (exclusive), found {version}; "
+            f"check shared_runtime against its AppTest before widening SUPPORTED_STREAMLIT"
+        )
+
+
+@contextmanager
+def shared_runtime():
+    """Let AppTest sessions run concurrently in one process.
+
+    Every AppTest run installs a mock Runtime as the process-wide instance and
+    clears it when done, which breaks any other session still running. While
+    this is active, the first mock installed stays in place for every session
+    and the per-run swaps are ignored.
+    """
+    check_streamlit_version()
+    lock = threading.Lock()
+
+    class KeepFirstInstance(type):
+        def __setattr__(cls, name, value):
+            if name != '_instance':
+                return super().__setattr__(name, value)
+            with lock:
+                if value is not None and Runtime._instance is None:
+                    Runtime._instance = value
+
+    app_test.Runtime = KeepFirstInstance('Runtime', (Runtime,), {})
+    try:
+        yield
+    finally:
+        app_test.Runtime = Runtime
+        Runtime._instance = None
+
+
+def run_session(session_id, steps, seed, timeout, record):
+    """One viewer: open the app, then click through sections and sliders"""
+    rng = random.Random(seed * 100_003 + session_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    sections = list(at.sidebar.radio[0].options)
+    for _ in range(steps):
+        section = rng.choice(sections)
+        start = time.perf_counter()
+        at.sidebar.radio[0].set_value(section).run()
+        record(section, time.perf_counter() - start, at)
+        if section == PRODUCT_SECTION and len(at.slider) >= 2:
+            start = time.perf_counter()
+            at.slider[0].set_value(rng.randint(5, 20))
+            at.slider[1].set_value(rng.choice([0, 50, 100, 250, 500])).run()
+            record(f"{section} (sliders)", time.perf_counter() - start, at)
+
+
+def run_level(sessions, steps, seed, timeout):
+    """Run `sessions` concurrent viewers and summarize what they saw"""
+    latencies = defaultdict(list)
+    errors = []
+    lock = threading.Lock()
+
+    def record(section, seconds, at):
+        messages = [str(element.value) for element in list(at.exception) + list(at.error)]
+        with lock:
+            latencies[section].append(seconds)
+            errors.extend(messages)
+
+    def session(session_id):
+        try:
+            run_session(session_id, steps, seed, timeout, record)
+        except Exception as e:
+            with lock:
+                errors.append(f"session {session_id} aborted: {e!r}")
+
+    loader = data_loader_module.data_loader
+    sampler = MemorySampler()
+    sampler.start()
+    with shared_runtime(), PoolWaits(loader) as waits:
+        threads = [
+            threading.Thread(target=session, args=(i,), daemon=True)
+            for i in range(sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    end_mb = sampler.stop()
+
+    reruns = sum(len(samples) for samples in latencies.values())
+    ms = lambda value: None if value is None else round(value * 1000, 1)
+    return {
+        'sessions': sessions,
+        'steps': steps,
+        'seconds': round(elapsed, 2),
+        'reruns': reruns,
+        'reruns_per_s': round(reruns / elapsed, 2) if elapsed else None,
+        'sections': {
+            section: {
+                'count': len(samples),
+                'p50_ms': ms(percentile(samples, 50)),
+                'p95_ms': ms(percentile(samples, 95)),
+                'p99_ms': ms(percentile(samples, 99)),
+                'max_ms': ms(max(samples))
+            }
+            for section, samples in sorted(latencies.items())
+        },
+        'pool_wait': {
+            'count': len(waits.samples),
+            'p50_ms': ms(percentile(waits.samples, 50)),
+            'p95_ms': ms(percentile(waits.samples, 95)),
+            'max_ms': ms(max(waits.samples, default=None))
+        },
+        'locked_errors': sum('locked' in message or 'busy' in message for message in errors),
+        'errors': len(errors),
+        'first_errors': errors[:5],
+        'rss_mb': {
+            'start': None if sampler.start_mb is None else round(sampler.start_mb, 1),
+            'peak': None if sampler.peak_mb is None else round(sampler.peak_mb, 1),
+            'end': None if end_mb is None else round(end_mb, 1),
+            'growth': None if None in (sampler.start_mb, end_mb) else round(end_mb - sampler.start_mb, 1)
+        },
+        'pool': loader.connection_report()['pool']
+    }
+
+
+def print_level(result):
+    print(f"\n== {result['sessions']} sessions x {result['steps']} steps: "
+          f"{result['reruns']} reruns in {result['seconds']}s ({result['reruns_per_s']} reruns/s)")
+    print(f"{'section':<40} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for section, stats in result['sections'].items():
+        print(f"{section:<40} {stats['count']:>6} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+              f"{stats['p99_ms']:>9} {stats['max_ms']:>9}")
+    wait = result['pool_wait']
+    print(f"pool wait: p50 {wait['p50_ms']} ms, p95 {wait['p95_ms']} ms, max {wait['max_ms']} ms; "
+          f"SQLite locked/busy errors: {result['locked_errors']}; other errors: {result['errors']}")
+    rss = result['rss_mb']
+    print(f"RSS: start {rss['start']} MB, peak {rss['peak']} MB, end {rss['end']} MB (growth {rss['growth']} MB)")
+
+
+def prepare_database(scale, seed, source_dir=None):
+    """Point the app's global loader at a built database for the dataset"""
+    source_dir = os.path.abspath(source_dir) if source_dir else dataset_dir(scale, seed)
+    loader = data_loader_module.data_loader
+    loader.db_name = os.path.join(DATA_DIR, f"loadtest-{os.path.basename(source_dir)}.db")
+    loader.file_urls = get_local_paths(source_dir)
+    summary = loader.build_database()
+    if summary['failed']:
+        raise RuntimeError(f"could not build the load-test database: {summary['failed']}")
+    return source_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[50], help="concurrency levels to run")
+    parser.add_argument('--steps', type=int, default=10, help="section clicks per session")
+    parser.add_argument('--scale', type=float, default=0.1, help="synthetic dataset scale")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source-dir', help="use an existing directory of <table>.csv files instead")
+    parser.add_argument('--timeout', type=float, default=300, help="seconds allowed per rerun")
+    parser.add_argument('--output', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    source_dir = prepare_database(args.scale, args.seed, args.source_dir)
+    print(f"Database: {data_loader_module.data_loader.db_name} (from {source_dir})", file=sys.stderr)
+
+    results = []
+    for sessions in args.sessions:
+        result = run_level(sessions, args.steps, args.seed, args.timeout)
+        print_level(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': machine_metadata(), 'source_dir': source_dir, 'levels': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Benchmark suite: ingestion, every get_* query and every show_* figure build
+
+Run from the ecommerce/ directory:
+    python -m benchmarks.run --scales 0.1 1 --repeat 7
+    python -m benchmarks.run --source-dir /path/to/olist_csvs --output before.json
+
+Synthetic datasets are generated once per scale and seed under
+benchmarks/.data/. Each ingestion sample is a cold build_database() in a
+child process (for peak RSS). Query samples run with the result cache
+cleared; figure samples run show_* with Streamlit stubbed and the queries
+already cached, so they measure figure construction only.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly
+
+import components
+from config.performance_config import BENCH_MIN_REPEAT
+from data_loader import DataLoader
+from tools.generate_dataset import generate_dataset
+from tools.query_plan_report import iter_query_functions
+from utils.query_cache import query_cache
+from utils.figure_cache import figure_cache
+from benchmarks.streamlit_stub import patch_streamlit, restore_streamlit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, '.data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def summarize(samples):
+    """Median, IQR and extremes of a list of timings in seconds"""
+    ordered = sorted(samples)
+    if len(ordered) >= 2:
+        q1, _, q3 = statistics.quantiles(ordered, n=4, method='inclusive')
+    else:
+        q1 = q3 = ordered[0]
+    return {
+        'samples': ordered,
+        'median': statistics.median(ordered),
+        'iqr': q3 - q1,
+        'min': ordered[0],
+        'max': ordered[-1]
+    }
+
+
+def machine_metadata():
+    """Enough context to tell whether two result files are comparable"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__
+    }
+
+
+def dataset_dir(scale, seed):
+    """Synthetic dataset for a scale and seed, generated on first use"""
+    path = os.path.join(DATA_DIR, f"scale-{scale:g}-seed-{seed}")
+    marker = os.path.join(path, '.complete')
+    if not os.path.exists(marker):
+        print(f"Generating synthetic dataset at scale {scale:g} ...", file=sys.stderr)
+        generate_dataset(path, scale=scale, seed=seed)
+        open(marker, 'w').close()
+    return path
+
+
+def bench_ingestion(source_dir, db_path, repeat):
+    """Cold builds in child processes: seconds, rows/s and peak RSS"""
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.ingest', '--source-dir', source_dir, '--db', db_path],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ingestion failed:\n{result.stderr or result.stdout}")
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    stats = summarize([run['seconds'] for run in runs])
+    stats.update(
+        rows=runs[-1]['rows'],
+        rows_per_s=runs[-1]['rows'] / stats['median'],
+        peak_rss_mb=max((run['peak_rss_mb'] or 0) for run in runs) or None
+    )
+    return stats
+
+
+def bench_queries(conn, repeat):
+    """Each get_* with the result cache cleared before every sample.
+
+    One discarded call first warms SQLite's page cache and pandas, which
+    otherwise make the first sample much slower than the rest.
+    """
+    results = {}
+    for module_name, func in iter_query_functions():
+        query_cache.clear()
+        func(conn)
+        samples = []
+        for _ in range(repeat):
+            query_cache.clear()
+            start = time.perf_counter()
+            func(conn)
+            samples.append(time.perf_counter() - start)
+        results[f"query:{module_name}.{func.__name__}"] = summarize(samples)
+    return results
+
+
+def iter_show_functions():
+    """(module, function) for every show_* exported by components"""
+    for name in components.__all__:
+        func = getattr(components, name)
+        yield importlib.import_module(func.__module__), func
+
+
+def bench_figures(conn, repeat):
+    """Each show_* with Streamlit stubbed and its queries already cached.
+
+    The figure cache is cleared before every sample, so the figures are
+    really built.
+    """
+    import utils.helpers
+    modules = [module for module, _ in iter_show_functions()] + [utils.helpers]
+    originals = patch_streamlit(modules)
+    try:
+        results = {}
+        for module, func in iter_show_functions():
+            func(conn)  # warm the query cache
+            samples = []
+            for _ in range(repeat):
+                figure_cache.clear()
+                start = time.perf_counter()
+                func(conn)
+                samples.append(time.perf_counter() - start)
+            results[f"figure:{module.__name__.split('.')[-1]}.{func.__name__}"] = summarize(samples)
+        return results
+    finally:
+        restore_streamlit(originals)
+
+
+def resolve_datasets(scales=(), seed=0, source_dir=None):
+    """{label: source directory} for an explicit directory or synthetic scales"""
+    if source_dir:
+        return {'local': os.path.abspath(source_dir)}
+    return {f"scale-{scale:g}": dataset_dir(scale, seed) for scale in scales}
+
+
+def run_suite(source_dirs, repeat, ingest_repeat, seed=None):
+    """Benchmark every dataset; returns the results document"""
+    document = {
+        'metadata': machine_metadata(),
+        'repeat': repeat,
+        'ingest_repeat': ingest_repeat,
+        'seed': seed,
+        'datasets': {}
+    }
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for label, source_dir in source_dirs.items():
+        print(f"[{label}] ingestion", file=sys.stderr)
+        db_path = os.path.join(DATA_DIR, f"bench-{label}.db")
+        results = {'ingest:build_database': bench_ingestion(source_dir, db_path, ingest_repeat)}
+
+        loader = DataLoader(db_name=db_path, source_dir=source_dir)
+        conn = loader.get_connection()
+        try:
+            print(f"[{label}] queries", file=sys.stderr)
+            results.update(bench_queries(conn, repeat))
+            print(f"[{label}] figures", file=sys.stderr)
+            results.update(bench_figures(conn, repeat))
+        finally:
+            loader.release_connection(conn)
+            loader.close_all_connections()
+            query_cache.clear()
+        document['datasets'][label] = {'source_dir': source_dir, 'results': results}
+    return document
+
+
+def save_results(document, output=None):
+    """Write a results document, by default to benchmarks/results/<timestamp>.json"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def print_summary(document):
+    for label, dataset in document['datasets'].items():
+        print(f"\n== {label} ({dataset['source_dir']})")
+        for name, stats in dataset['results'].items():
+            line = f"{name:<60} median {stats['median'] * 1000:>10.2f} ms  iqr {stats['iqr'] * 1000:>8.2f} ms"
+            if 'rows_per_s' in stats:
+                line += f"  {stats['rows_per_s']:>12,.0f} rows/s  peak RSS {stats['peak_rss_mb']} MB"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, section queries and figure builds")
+    parser.add_argument('--scales', type=float, nargs='+', default=[0.1, 1.0],
+                        help="synthetic dataset scale factors (ignored with --source-dir)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source-dir', help="benchmark an existing directory of <table>.csv files instead")
+    parser.add_argument('--repeat', type=int, default=7, help="samples per query and figure")
+    parser.add_argument('--ingest-repeat', type=int, default=3, help="cold ingestion samples per dataset")
+    parser.add_argument('--output', help="results file (default benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+    if args.repeat < BENCH_MIN_REPEAT:
+        parser.error(f"--repeat must be at least {BENCH_MIN_REPEAT} for the regression gate to use the results")
+
+    source_dirs = resolve_datasets(args.scales, args.seed, args.source_dir)
+    document = run_suite(source_dirs, args.repeat, args.ingest_repeat, seed=args.seed)
+    output = save_results(document, args.output)
+    print_summary(document)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Minimal stand-in for the streamlit module so show_* functions can be timed
+without a running Streamlit server
+"""
+
+
+class StreamlitStub:
+    """Accepts any st.* call and returns something a component can use.
+
+    Widgets return their default value, layout helpers return stubs that also
+    work as context managers, and everything else is a no-op.
+    """
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(())
+
+    def columns(self, spec, *args, **kwargs):
+        count = spec if isinstance(spec, int) else len(spec)
+        return [StreamlitStub() for _ in range(count)]
+
+    def tabs(self, labels, *args, **kwargs):
+        return [StreamlitStub() for _ in labels]
+
+    def slider(self, label, min_value=None, max_value=None, value=None, *args, **kwargs):
+        return min_value if value is None else value
+
+    def selectbox(self, label, options, index=0, *args, **kwargs):
+        options = list(options)
+        return options[index] if options else None
+
+    def multiselect(self, label, options, default=None, *args, **kwargs):
+        return list(default or [])
+
+    def checkbox(self, label, value=False, *args, **kwargs):
+        return value
+
+    def fragment(self, func=None, *args, **kwargs):
+        return func if func is not None else (lambda f: f)
+
+
+def patch_streamlit(modules):
+    """Replace the st global of each module with a stub; returns the originals"""
+    originals = {}
+    for module in modules:
+        originals[module] = module.st
+        module.st = StreamlitStub()
+    return originals
+
+
+def restore_streamlit(originals):
+    for module, st in originals.items():
+        module.st = st
@@ -0,0 +1,61 @@
+"""
+Global sidebar filters shared by every analysis section
+"""
+import datetime
+import streamlit as st
+from utils.query_cache import read_sql
+from utils.filters import DashboardFilters, DEFAULT_STATUSES
+
+def show_filters(conn):
+    """Draw the filter widgets and return the selection as DashboardFilters"""
+    options = get_filter_options(conn)
+    st.header("🔎 Filters")
+
+    if options.empty:
+        return DashboardFilters()
+
+    first_day = _to_date(options['first_purchase'].min())
+    last_day = _to_date(options['last_purchase'].max())
+    selected_range = st.date_input(
+        "Purchase date:",
+        value=(first_day, last_day),
+        min_value=first_day,
+        max_value=last_day
+    )
+    # While a range is being picked only its start is set
+    start_date, end_date = (tuple(selected_range) + (None, None))[:2]
+
+    states = st.multiselect(
+        "Customer state:",
+        sorted(options['customer_state'].dropna().unique()),
+        placeholder="All states"
+    )
+
+    all_statuses = sorted(options['order_status'].unique())
+    statuses = st.multiselect(
+        "Order status:",
+        all_statuses,
+        default=[status for status in DEFAULT_STATUSES if status in all_statuses],
+        placeholder="All statuses"
+    )
+
+    # Bounds that cover the whole history are no filter at all, so the
+    # default selection keeps using the precomputed summary tables
+    return DashboardFilters(
+        start_date=None if start_date is None or start_date <= first_day else start_date,
+        end_date=None if end_date is None or end_date >= last_day else end_date,
+        states=tuple(sorted(states)),
+        statuses=tuple(sorted(statuses))
+    )
+
+def _to_date(epoch_seconds):
+    return datetime.datetime.fromtimestamp(int(epoch_seconds), datetime.timezone.utc).date()
+
+def get_filter_options(conn):
+    """Statuses, states and purchase date bounds (precomputed in mv_filter_options)"""
+    query = """
+    SELECT order_status, customer_state, total_orders, first_purchase, last_purchase
+    FROM mv_filter_options
+    """
+
+    return read_sql(conn, query)
\ No newline at end of file
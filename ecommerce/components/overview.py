@@ -1,43 +1,52 @@
 """
 Overview Component with Viridis Theme - CORRECTED
 """
+import sqlite3
+from dataclasses import dataclass
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from utils.helpers import apply_viridis_style, format_currency, format_number, format_integer
+from utils.helpers import apply_viridis_style, format_currency, format_number, format_integer, plotly_chart
+from utils.query_cache import fetch_one
+from utils.figure_cache import cached_figure
+from utils.filters import DEFAULT_STATUSES, uses_summary_tables
 
-def show_overview(conn):
+def show_overview(conn, filters=None):
     st.header("📊 E-commerce Overview")
     
     # Get main metrics
-    metrics = get_overview_metrics(conn)
+    try:
+        metrics = get_overview_metrics(conn, filters)
+    except sqlite3.Error as e:
+        st.error(f"❌ Could not compute overview metrics: {str(e)}")
+        return
     
     # Display metrics in columns with Viridis colors
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.metric(
-            "📦 Delivered Orders", 
-            format_integer(metrics['total_orders'])
+            "📦 Delivered Orders" if filters is None or filters.statuses == DEFAULT_STATUSES else "📦 Orders", 
+            format_integer(metrics.total_orders)
         )
     
     with col2:
         st.metric(
             "👥 Unique Customers", 
-            format_integer(metrics['unique_customers'])
+            format_integer(metrics.unique_customers)
         )
     
     with col3:
         st.metric(
             "💰 Total Revenue", 
-            format_currency(metrics['total_revenue'])
+            format_currency(metrics.total_revenue)
         )
     
     with col4:
         st.metric(
             "📚 Unique Products", 
-            format_integer(metrics['unique_products'])
+            format_integer(metrics.unique_products)
         )
     
     st.markdown("---")
@@ -46,19 +55,19 @@ def show_overview(conn):
     col5, col6, col7, col8 = st.columns(4)
     
     with col5:
-        st.metric("🏪 Active Sellers", format_integer(metrics['active_sellers']))
+        st.metric("🏪 Active Sellers", format_integer(metrics.active_sellers))
     
     with col6:
-        st.metric("📈 Average Ticket", format_currency(metrics['avg_ticket']))
+        st.metric("📈 Average Ticket", format_currency(metrics.avg_ticket))
     
     with col7:
         # Calculate and show Revenue per Customer directly
-        revenue_per_customer = metrics['total_revenue'] / max(metrics['unique_customers'], 1)
+        revenue_per_customer = metrics.total_revenue / max(metrics.unique_customers, 1)
         st.metric("💰 Revenue per Customer", format_currency(revenue_per_customer))
     
     with col8:
         # Corrected format for review score
-        review_score = metrics['avg_review_score']
+        review_score = metrics.avg_review_score
         if review_score == int(review_score):
             formatted_score = str(int(review_score))
         else:
@@ -73,15 +82,20 @@ def show_overview(conn):
         'Metric': ['Revenue Efficiency', 'Service Quality'],
         'Value': [
             # Revenue Efficiency: Revenue per customer vs reasonable target
-            min((metrics['total_revenue'] / max(metrics['unique_customers'], 1)) / 500 * 100, 100),
+            min((metrics.total_revenue / max(metrics.unique_customers, 1)) / 500 * 100, 100),
             
             # Service Quality: Convert 5-star scale to percentage
-            min(metrics['avg_review_score'] / 5 * 100, 100)
+            min(metrics.avg_review_score / 5 * 100, 100)
         ]
     }
     
     perf_df = pd.DataFrame(perf_data)
     
+    fig = cached_figure('overview_performance', perf_df, lambda: _build_performance_figure(perf_df))
+    plotly_chart(fig, use_container_width=True)
+
+def _build_performance_figure(perf_df):
+    """Build the horizontal performance indicator bars"""
     fig = go.Figure()
     
     # Use Viridis colors correctly
@@ -110,57 +124,78 @@ def show_overview(conn):
         }
     )
     fig.update_xaxes(range=[0, 100], title_text="Score (%)")
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def get_overview_metrics(conn):
-    """Get main metrics for the overview"""
-    queries = {
-        'total_orders': """
-            SELECT COUNT(DISTINCT order_id) 
-            FROM orders 
-            WHERE order_status = 'delivered'
-        """,
-        'unique_customers': """
-            SELECT COUNT(DISTINCT customer_unique_id) 
-            FROM customers
-        """,
-        'total_revenue': """
-            SELECT SUM(oi.price) 
-            FROM order_items oi 
-            JOIN orders o ON oi.order_id = o.order_id 
-            WHERE o.order_status = 'delivered'
-        """,
-        'unique_products': """
-            SELECT COUNT(DISTINCT product_id) 
-            FROM products
-        """,
-        'active_sellers': """
-            SELECT COUNT(DISTINCT seller_id) 
-            FROM sellers
-        """,
-        'avg_ticket': """
-            SELECT AVG(sub.total) 
-            FROM (
-                SELECT oi.order_id, SUM(oi.price) as total
-                FROM order_items oi 
-                JOIN orders o ON oi.order_id = o.order_id 
-                WHERE o.order_status = 'delivered'
-                GROUP BY oi.order_id
-            ) sub
-        """,
-        'avg_review_score': """
-            SELECT AVG(review_score) 
-            FROM order_reviews
-        """
-    }
-    
-    metrics = {}
-    for key, query in queries.items():
-        try:
-            result = pd.read_sql_query(query, conn).iloc[0, 0]
-            metrics[key] = result if result is not None else 0
-        except:
-            metrics[key] = 0
-    
-    return metrics
\ No newline at end of file
+@dataclass(frozen=True)
+class OverviewMetrics:
+    """Main KPIs shown on the overview page"""
+    total_orders: int
+    unique_customers: int
+    total_revenue: float
+    unique_products: int
+    active_sellers: int
+    avg_ticket: float
+    avg_review_score: float
+
+def get_overview_metrics(conn, filters=None):
+    """Get main metrics for the overview (precomputed in mv_overview).
+
+    Unfiltered, unique customers and the review score cover every customer
+    and review; with filters they are those of the selected orders.
+    Database errors are raised to the caller instead of being turned into
+    zeros.
+    """
+    if not uses_summary_tables(filters):
+        return _filtered_overview_metrics(conn, filters)
+
+    query = """
+    SELECT
+        total_orders, unique_customers, total_revenue, unique_products,
+        active_sellers, avg_ticket, avg_review_score
+    FROM mv_overview
+    """
+    
+    return _overview_metrics(fetch_one(conn, query))
+
+
+def _filtered_overview_metrics(conn, filters):
+    """Overview metrics for the filtered orders.
+
+    Customers and the review score come from the filtered fact_orders rows;
+    products and sellers are catalogue counts and stay global.
+    """
+    where, params = filters.where()
+    query = f"""
+    WITH selected AS (
+        SELECT
+            COUNT(*) as total_orders,
+            COUNT(DISTINCT customer_unique_id) as unique_customers,
+            COALESCE(SUM(item_revenue), 0) as total_revenue,
+            COALESCE(AVG(CASE WHEN item_count > 0 THEN item_revenue END), 0) as avg_ticket,
+            COALESCE(SUM(review_score * review_count) / SUM(review_count), 0) as avg_review_score
+        FROM fact_orders f
+        WHERE {where}
+    )
+    SELECT
+        s.total_orders,
+        s.unique_customers,
+        s.total_revenue,
+        o.unique_products,
+        o.active_sellers,
+        s.avg_ticket,
+        s.avg_review_score
+    FROM selected s, mv_overview o
+    """
+    
+    return _overview_metrics(fetch_one(conn, query, params))
+
+def _overview_metrics(row):
+    return OverviewMetrics(
+        total_orders=int(row[0]),
+        unique_customers=int(row[1]),
+        total_revenue=float(row[2]),
+        unique_products=int(row[3]),
+        active_sellers=int(row[4]),
+        avg_ticket=float(row[5]),
+        avg_review_score=float(row[6])
+    )
\ No newline at end of file
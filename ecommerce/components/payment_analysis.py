@@ -2,17 +2,18 @@
 Payment Methods Analysis Component with Viridis Theme
 """
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number
+from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number, make_subplots, plotly_chart
+from utils.query_cache import read_sql
+from utils.figure_cache import cached_figure
+from utils.filters import uses_summary_tables
 
-def show_payment_analysis(conn):
+def show_payment_analysis(conn, filters=None):
     st.header("💳 Payment Methods Analysis")
     
     # Load data
-    df_payments = get_payment_data(conn)
+    df_payments = get_payment_data(conn, filters)
     
     if df_payments.empty:
         st.warning("No payment data found.")
@@ -30,6 +31,11 @@ def show_payment_analysis(conn):
     
     st.markdown("---")
     
+    fig = cached_figure('payments', df_payments, lambda: _build_payment_figure(df_payments))
+    plotly_chart(fig, use_container_width=True)
+
+def _build_payment_figure(df_payments):
+    """Build the 2x2 payment methods figure"""
     # Create subplots
     fig = make_subplots(
         rows=2, cols=2,
@@ -140,26 +146,39 @@ def show_payment_analysis(conn):
             font=dict(size=14, color="#440154", family="Segoe UI, sans-serif"),
             y=annotation.y + 0.02
         )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def get_payment_data(conn, filters=None):
+    """Get payment methods data with bank_slip instead of boleto (precomputed in mv_payments)"""
+    if not uses_summary_tables(filters):
+        return _filtered_payment_data(conn, filters)
 
-def get_payment_data(conn):
-    """Get payment methods data with bank_slip instead of boleto"""
     query = """
+    SELECT payment_method, total_transactions, total_value, average_value, unique_orders
+    FROM mv_payments
+    ORDER BY total_value DESC
+    """
+    
+    return read_sql(conn, query)
+
+def _filtered_payment_data(conn, filters):
+    """Same aggregate as mv_payments for the payments of the filtered orders"""
+    where, params = filters.where()
+    query = f"""
     SELECT
-        CASE 
+        CASE
             WHEN op.payment_type = 'boleto' THEN 'bank_slip'
-            ELSE op.payment_type 
+            ELSE op.payment_type
         END as payment_method,
         COUNT(*) as total_transactions,
         SUM(op.payment_value) as total_value,
         AVG(op.payment_value) as average_value,
         COUNT(DISTINCT op.order_id) as unique_orders
-    FROM order_payments op
-    JOIN orders o ON op.order_id = o.order_id
-    WHERE o.order_status = 'delivered'
+    FROM fact_orders f
+    JOIN order_payments op ON op.order_id = f.order_id
+    WHERE {where}
     GROUP BY payment_method
     ORDER BY total_value DESC
     """
     
-    return pd.read_sql_query(query, conn)
\ No newline at end of file
+    return read_sql(conn, query, params)
\ No newline at end of file
@@ -2,17 +2,18 @@
 Product and Category Analysis Component with Viridis Theme - LAYOUT OPTIMIZADO
 """
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number
+from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number, make_subplots, plotly_chart, fragment
+from utils.query_cache import read_sql
+from utils.figure_cache import cached_figure
+from utils.filters import uses_summary_tables
 
-def show_product_analysis(conn):
+def show_product_analysis(conn, filters=None):
     st.header("📦 Product and Category Analysis")
     
     # Load category data
-    df_categories = get_category_data(conn)
+    df_categories = get_category_data(conn, filters)
     
     if df_categories.empty:
         st.warning("No product data found.")
@@ -32,6 +33,11 @@ def show_product_analysis(conn):
     
     st.markdown("---")
     
+    show_category_chart(df_categories)
+
+@fragment
+def show_category_chart(df_categories):
+    """Sliders and chart; moving a slider reruns only this fragment"""
     # Filters
     col1, col2 = st.columns(2)
     with col1:
@@ -39,6 +45,15 @@ def show_product_analysis(conn):
     with col2:
         min_orders = st.slider("Minimum orders per category:", 0, 1000, 100)
     
+    fig = cached_figure(
+        'categories', df_categories,
+        lambda: _build_category_figure(df_categories, top_n, min_orders),
+        top_n=top_n, min_orders=min_orders
+    )
+    plotly_chart(fig, use_container_width=True)
+
+def _build_category_figure(df_categories, top_n, min_orders):
+    """Build the treemap and category charts for the slider selection"""
     # Filter data
     filtered_df = df_categories[df_categories['total_orders'] >= min_orders].head(top_n)
     
@@ -190,52 +205,42 @@ def show_product_analysis(conn):
                 yanchor='top',
                 font=dict(size=14, color="#440154", family="Segoe UI, sans-serif")
             )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def get_category_data(conn):
-    """Get product and category data with proper translations - CORREGIDO"""
-    # CORRECCIÓN: Cargar traducciones desde la tabla correcta
-    try:
-        # Cambiar el nombre de la tabla a 'category_translations'
-        df_translations = pd.read_sql_query("SELECT * FROM category_translations", conn)
-    except Exception as e:
-        st.warning(f"⚠️ No se pudieron cargar las traducciones: {e}")
-        df_translations = pd.DataFrame()
+def get_category_data(conn, filters=None):
+    """Get product and category data with translations (precomputed in mv_categories)"""
+    if not uses_summary_tables(filters):
+        return _filtered_category_data(conn, filters)
 
     query = """
+    SELECT category, total_orders, total_revenue, average_price, unique_products
+    FROM mv_categories
+    WHERE total_orders > 100
+    ORDER BY total_revenue DESC
+    LIMIT 20
+    """
+
+    return read_sql(conn, query)
+
+def _filtered_category_data(conn, filters):
+    """Same aggregate as mv_categories for the items of the filtered orders"""
+    where, params = filters.where()
+    query = f"""
     SELECT
-        p.product_category_name as category,
+        COALESCE(t.product_category_name_english, p.product_category_name) as category,
         COUNT(DISTINCT oi.order_id) as total_orders,
         SUM(oi.price) as total_revenue,
         AVG(oi.price) as average_price,
         COUNT(DISTINCT oi.product_id) as unique_products
-    FROM order_items oi
+    FROM fact_orders f
+    JOIN order_items oi ON oi.order_id = f.order_id
     JOIN products p ON oi.product_id = p.product_id
-    JOIN orders o ON oi.order_id = o.order_id
-    WHERE o.order_status = 'delivered'
+    LEFT JOIN category_translations t ON t.product_category_name = p.product_category_name
+    WHERE {where}
     GROUP BY p.product_category_name
-    HAVING COUNT(DISTINCT oi.order_id) > 100
+    HAVING total_orders > 100
     ORDER BY total_revenue DESC
     LIMIT 20
     """
 
-    df_categories = pd.read_sql_query(query, conn)
-
-    # Apply translations if available - CORREGIDO
-    if not df_translations.empty:
-        # Verificar las columnas disponibles en las traducciones
-        portuguese_col = df_translations.columns[0]
-        english_col = df_translations.columns[1]
-        
-        df_categories = df_categories.merge(
-            df_translations,
-            left_on='category',
-            right_on=portuguese_col,
-            how='left'
-        )
-        
-        # Usar nombres en inglés donde estén disponibles
-        df_categories['category'] = df_categories[english_col].fillna(df_categories['category'])
-
-    return df_categories
\ No newline at end of file
+    return read_sql(conn, query, params)
\ No newline at end of file
@@ -2,17 +2,18 @@
 Sales Analysis by State Component with Viridis Theme
 """
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number
+from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number, make_subplots, plotly_chart
+from utils.query_cache import read_sql
+from utils.figure_cache import cached_figure
+from utils.filters import uses_summary_tables
 
-def show_sales_analysis(conn):
+def show_sales_analysis(conn, filters=None):
     st.header("🏢 Sales Analysis by State")
     
     # Load data
-    df_sales = get_sales_by_state(conn)
+    df_sales = get_sales_by_state(conn, filters)
     
     if df_sales.empty:
         st.warning("No sales data by state found.")
@@ -29,6 +30,20 @@ def show_sales_analysis(conn):
     
     st.markdown("---")
     
+    fig = cached_figure('sales_by_state', df_sales, lambda: _build_sales_figure(df_sales))
+    plotly_chart(fig, use_container_width=True)
+    
+    # Additional scatter plot
+    st.subheader("📈 Relationship: Orders vs Average Price")
+    
+    scatter_fig = cached_figure('sales_scatter', df_sales, lambda: _build_sales_scatter(df_sales))
+    plotly_chart(scatter_fig, use_container_width=True)
+    
+    # ELIMINADO: Sección "Detailed Data by State" y su tabla
+    # Esta sección ha sido removida por solicitud del usuario
+
+def _build_sales_figure(df_sales):
+    """Build the 2x2 revenue/orders/share/price figure for the states"""
     # Create subplots with professional layout
     fig = make_subplots(
         rows=2, cols=2,
@@ -160,12 +175,10 @@ def show_sales_analysis(conn):
         title_y=0.98,  # Position title higher (closer to 1.0 means closer to top)
         title_x=0.5,   # Center the title
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # Additional scatter plot
-    st.subheader("📈 Relationship: Orders vs Average Price")
-    
+    return fig
+
+def _build_sales_scatter(df_sales):
+    """Build the orders vs average price scatter for the states"""
     scatter_fig = px.scatter(
         df_sales, 
         x='total_orders', 
@@ -188,25 +201,34 @@ def show_sales_analysis(conn):
     )
     
     scatter_fig = apply_viridis_style(scatter_fig, "Orders vs Average Price by State")
-    st.plotly_chart(scatter_fig, use_container_width=True)
-    
-    # ELIMINADO: Sección "Detailed Data by State" y su tabla
-    # Esta sección ha sido removida por solicitud del usuario
+    return scatter_fig
+
+def get_sales_by_state(conn, filters=None):
+    """Get sales data grouped by state (precomputed in mv_sales_by_state)"""
+    if not uses_summary_tables(filters):
+        return _filtered_sales_by_state(conn, filters)
 
-def get_sales_by_state(conn):
-    """Get sales data grouped by state"""
     query = """
-    SELECT 
-        c.customer_state as state,
-        COUNT(DISTINCT o.order_id) as total_orders,
-        SUM(oi.price) as total_revenue,
-        AVG(oi.price) as average_price
-    FROM orders o
-    JOIN customers c ON o.customer_id = c.customer_id
-    JOIN order_items oi ON o.order_id = oi.order_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY c.customer_state
+    SELECT state, total_orders, total_revenue, average_price
+    FROM mv_sales_by_state
+    ORDER BY total_revenue DESC
+    """
+    
+    return read_sql(conn, query)
+
+def _filtered_sales_by_state(conn, filters):
+    """Same aggregate as mv_sales_by_state over the filtered fact_orders rows"""
+    where, params = filters.where()
+    query = f"""
+    SELECT
+        customer_state as state,
+        COUNT(*) as total_orders,
+        SUM(item_revenue) as total_revenue,
+        SUM(item_revenue) / SUM(item_count) as average_price
+    FROM fact_orders f
+    WHERE {where} AND item_count > 0
+    GROUP BY customer_state
     ORDER BY total_revenue DESC
     """
     
-    return pd.read_sql_query(query, conn)
\ No newline at end of file
+    return read_sql(conn, query, params)
\ No newline at end of file
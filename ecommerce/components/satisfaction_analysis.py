@@ -2,17 +2,18 @@
 Customer Satisfaction Analysis Component with Viridis Theme - CORREGIDO
 """
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number
+from utils.helpers import apply_viridis_style, get_viridis_color, format_currency, format_number, make_subplots, plotly_chart
+from utils.query_cache import read_sql
+from utils.figure_cache import cached_figure
+from utils.filters import uses_summary_tables
 
-def show_satisfaction_analysis(conn):
+def show_satisfaction_analysis(conn, filters=None):
     st.header("😊 Customer Satisfaction Analysis")
     
     # Load satisfaction data
-    df_satisfaction = get_satisfaction_data(conn)
+    df_satisfaction = get_satisfaction_data(conn, filters)
     
     if df_satisfaction.empty:
         st.warning("No satisfaction data found.")
@@ -37,6 +38,43 @@ def show_satisfaction_analysis(conn):
     
     st.markdown("---")
     
+    fig = cached_figure('satisfaction', df_satisfaction, lambda: _build_satisfaction_figure(df_satisfaction))
+    plotly_chart(fig, use_container_width=True)
+    
+    # ESPACIADO ENTRE SECCIONES
+    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+    
+    # GRÁFICOS INDIVIDUALES UNO DEBAJO DEL OTRO, OCUPANDO TODO EL ANCHO
+    
+    # Sección 1: Satisfaction by State (ocupa todo el ancho)
+    st.subheader("🏢 Satisfaction by State")
+    
+    df_satisfaction_state = get_satisfaction_by_state(conn, filters)
+    
+    if not df_satisfaction_state.empty:
+        state_fig = cached_figure(
+            'satisfaction_by_state', df_satisfaction_state,
+            lambda: _build_state_figure(df_satisfaction_state)
+        )
+        plotly_chart(state_fig, use_container_width=True)
+    
+    # ESPACIADO ENTRE SECCIONES
+    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+    
+    # Sección 2: Satisfaction Over Time (ocupa todo el ancho)
+    st.subheader("⏰ Satisfaction Over Time")
+    
+    df_satisfaction_temporal = get_satisfaction_temporal(conn, filters)
+    
+    if not df_satisfaction_temporal.empty:
+        temporal_fig = cached_figure(
+            'satisfaction_temporal', df_satisfaction_temporal,
+            lambda: _build_satisfaction_temporal_figure(df_satisfaction_temporal)
+        )
+        plotly_chart(temporal_fig, use_container_width=True)
+
+def _build_satisfaction_figure(df_satisfaction):
+    """Build the 2x2 review score figure"""
     # CONFIGURACIÓN DE SUBPLOTS CON ESPACIADO OPTIMIZADO
     fig = make_subplots(
         rows=2, cols=2,
@@ -167,152 +205,174 @@ def show_satisfaction_analysis(conn):
             xref='paper',
             yref='paper'
         )
+    return fig
+
+def _build_state_figure(df_satisfaction_state):
+    """Build the average review score by state bar chart"""
+    state_fig = px.bar(
+        df_satisfaction_state, 
+        x='state', 
+        y='average_review_score',
+        color='average_review_score',
+        color_continuous_scale='Viridis',
+        labels={'average_review_score': 'Average Score', 'state': 'State'}
+    )
     
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # ESPACIADO ENTRE SECCIONES
-    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
-    
-    # GRÁFICOS INDIVIDUALES UNO DEBAJO DEL OTRO, OCUPANDO TODO EL ANCHO
-    
-    # Sección 1: Satisfaction by State (ocupa todo el ancho)
-    st.subheader("🏢 Satisfaction by State")
-    
-    df_satisfaction_state = get_satisfaction_by_state(conn)
-    
-    if not df_satisfaction_state.empty:
-        state_fig = px.bar(
-            df_satisfaction_state, 
-            x='state', 
-            y='average_review_score',
-            color='average_review_score',
-            color_continuous_scale='Viridis',
-            labels={'average_review_score': 'Average Score', 'state': 'State'}
-        )
-        
-        # Aplicar estilo manualmente SIN usar apply_viridis_style
-        state_fig.update_layout(
-            height=250,  # Altura ajustada a 250
-            margin=dict(t=30, b=60, l=60, r=30),
-            showlegend=False,
-            xaxis_title="State",
-            yaxis_title="Average Review Score",  # Etiqueta del eje Y agregada
-            font=dict(size=10),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-        state_fig.update_traces(
-            hovertemplate='<b>State: %{x}</b><br>Average Score: %{customdata:.1f}<extra></extra>',
-            customdata=df_satisfaction_state['average_review_score']
-        )
-        state_fig.update_xaxes(
-            tickangle=45, 
-            tickfont=dict(size=9),
-            gridcolor='rgba(128,128,128,0.2)'
-        )
-        state_fig.update_yaxes(
-            tickfont=dict(size=9),
-            gridcolor='rgba(128,128,128,0.2)'
-        )
-        st.plotly_chart(state_fig, use_container_width=True)
-    
-    # ESPACIADO ENTRE SECCIONES
-    st.markdown("<div style='margin-top: 30px;'></div>", unsafe_allow_html=True)
+    # Aplicar estilo manualmente SIN usar apply_viridis_style
+    state_fig.update_layout(
+        height=250,  # Altura ajustada a 250
+        margin=dict(t=30, b=60, l=60, r=30),
+        showlegend=False,
+        xaxis_title="State",
+        yaxis_title="Average Review Score",  # Etiqueta del eje Y agregada
+        font=dict(size=10),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    state_fig.update_traces(
+        hovertemplate='<b>State: %{x}</b><br>Average Score: %{customdata:.1f}<extra></extra>',
+        customdata=df_satisfaction_state['average_review_score']
+    )
+    state_fig.update_xaxes(
+        tickangle=45, 
+        tickfont=dict(size=9),
+        gridcolor='rgba(128,128,128,0.2)'
+    )
+    state_fig.update_yaxes(
+        tickfont=dict(size=9),
+        gridcolor='rgba(128,128,128,0.2)'
+    )
+    return state_fig
+
+def _build_satisfaction_temporal_figure(df_satisfaction_temporal):
+    """Build the average review score over time line chart"""
+    temporal_fig = px.line(
+        df_satisfaction_temporal, 
+        x='month', 
+        y='average_review_score',
+        markers=True, 
+        line_shape='linear',
+        labels={'average_review_score': 'Average Score', 'month': 'Month'}
+    )
     
-    # Sección 2: Satisfaction Over Time (ocupa todo el ancho)
-    st.subheader("⏰ Satisfaction Over Time")
+    # Aplicar estilo manualmente SIN usar apply_viridis_style
+    temporal_fig.update_layout(
+        height=250,  # Altura ajustada a 250
+        margin=dict(t=30, b=70, l=60, r=30),
+        showlegend=False,
+        xaxis_title="Month",
+        yaxis_title="Average Review Score",  # Etiqueta del eje Y agregada
+        font=dict(size=10),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+    )
+    temporal_fig.update_traces(
+        hovertemplate='<b>Month: %{x}</b><br>Average Score: %{customdata:.1f}<extra></extra>',
+        customdata=df_satisfaction_temporal['average_review_score'],
+        line=dict(width=2),
+        marker=dict(size=4)
+    )
+    temporal_fig.update_xaxes(
+        tickangle=45, 
+        tickfont=dict(size=9),
+        gridcolor='rgba(128,128,128,0.2)'
+    )
+    temporal_fig.update_yaxes(
+        tickfont=dict(size=9),
+        gridcolor='rgba(128,128,128,0.2)'
+    )
+    return temporal_fig
+
+def get_satisfaction_data(conn, filters=None):
+    """Get customer satisfaction data (precomputed in mv_satisfaction)"""
+    if not uses_summary_tables(filters):
+        return _filtered_satisfaction_data(conn, filters)
+
+    query = """
+    SELECT review_score, total_reviews, average_order_price, average_shipping_cost
+    FROM mv_satisfaction
+    ORDER BY review_score
+    """
     
-    df_satisfaction_temporal = get_satisfaction_temporal(conn)
+    return read_sql(conn, query)
+
+def get_satisfaction_by_state(conn, filters=None):
+    """Get satisfaction data by state (precomputed in mv_satisfaction_by_state)"""
+    if not uses_summary_tables(filters):
+        return _filtered_satisfaction_by_state(conn, filters)
+
+    query = """
+    SELECT state, average_review_score, total_reviews, average_order_price
+    FROM mv_satisfaction_by_state
+    WHERE total_reviews > 100
+    ORDER BY average_review_score DESC
+    """
     
-    if not df_satisfaction_temporal.empty:
-        temporal_fig = px.line(
-            df_satisfaction_temporal, 
-            x='month', 
-            y='average_review_score',
-            markers=True, 
-            line_shape='linear',
-            labels={'average_review_score': 'Average Score', 'month': 'Month'}
-        )
-        
-        # Aplicar estilo manualmente SIN usar apply_viridis_style
-        temporal_fig.update_layout(
-            height=250,  # Altura ajustada a 250
-            margin=dict(t=30, b=70, l=60, r=30),
-            showlegend=False,
-            xaxis_title="Month",
-            yaxis_title="Average Review Score",  # Etiqueta del eje Y agregada
-            font=dict(size=10),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-        )
-        temporal_fig.update_traces(
-            hovertemplate='<b>Month: %{x}</b><br>Average Score: %{customdata:.1f}<extra></extra>',
-            customdata=df_satisfaction_temporal['average_review_score'],
-            line=dict(width=2),
-            marker=dict(size=4)
-        )
-        temporal_fig.update_xaxes(
-            tickangle=45, 
-            tickfont=dict(size=9),
-            gridcolor='rgba(128,128,128,0.2)'
-        )
-        temporal_fig.update_yaxes(
-            tickfont=dict(size=9),
-            gridcolor='rgba(128,128,128,0.2)'
-        )
-        st.plotly_chart(temporal_fig, use_container_width=True)
+    return read_sql(conn, query)
+
+def get_satisfaction_temporal(conn, filters=None):
+    """Get temporal evolution of satisfaction (precomputed in mv_satisfaction_temporal)"""
+    if not uses_summary_tables(filters):
+        return _filtered_satisfaction_temporal(conn, filters)
 
-def get_satisfaction_data(conn):
-    """Get customer satisfaction data"""
     query = """
+    SELECT month, average_review_score, total_reviews
+    FROM mv_satisfaction_temporal
+    WHERE total_reviews > 10
+    ORDER BY month
+    """
+    
+    return read_sql(conn, query)
+
+def _filtered_satisfaction_data(conn, filters):
+    """Same aggregate as mv_satisfaction over the reviews of the filtered orders"""
+    where, params = filters.where()
+    query = f"""
     SELECT
-        orr.review_score as review_score,
-        COUNT(*) as total_reviews,
-        AVG(oi.price) as average_order_price,
-        AVG(oi.freight_value) as average_shipping_cost
-    FROM order_reviews orr
-    JOIN orders o ON orr.order_id = o.order_id
-    JOIN order_items oi ON o.order_id = oi.order_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY orr.review_score
-    ORDER BY orr.review_score
+        r.review_score,
+        SUM(f.item_count) as total_reviews,
+        SUM(f.item_revenue) / SUM(f.item_count) as average_order_price,
+        SUM(f.freight_total) / SUM(f.item_count) as average_shipping_cost
+    FROM fact_orders f
+    JOIN order_reviews r ON r.order_id = f.order_id
+    WHERE {where} AND f.item_count > 0
+    GROUP BY r.review_score
+    ORDER BY r.review_score
     """
     
-    return pd.read_sql_query(query, conn)
+    return read_sql(conn, query, params)
 
-def get_satisfaction_by_state(conn):
-    """Get satisfaction data by state"""
-    query = """
+def _filtered_satisfaction_by_state(conn, filters):
+    """Same aggregate as mv_satisfaction_by_state over the filtered fact_orders rows"""
+    where, params = filters.where()
+    query = f"""
     SELECT
-        c.customer_state as state,
-        AVG(orr.review_score) as average_review_score,
-        COUNT(orr.review_id) as total_reviews,
-        AVG(oi.price) as average_order_price
-    FROM order_reviews orr
-    JOIN orders o ON orr.order_id = o.order_id
-    JOIN customers c ON o.customer_id = c.customer_id
-    JOIN order_items oi ON o.order_id = oi.order_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY c.customer_state
-    HAVING COUNT(orr.review_id) > 100
+        customer_state as state,
+        SUM(review_score * review_count * item_count) / SUM(review_count * item_count) as average_review_score,
+        SUM(review_count * item_count) as total_reviews,
+        SUM(item_revenue * review_count) / SUM(item_count * review_count) as average_order_price
+    FROM fact_orders f
+    WHERE {where} AND review_count > 0 AND item_count > 0
+    GROUP BY customer_state
+    HAVING total_reviews > 100
     ORDER BY average_review_score DESC
     """
     
-    return pd.read_sql_query(query, conn)
+    return read_sql(conn, query, params)
 
-def get_satisfaction_temporal(conn):
-    """Get temporal evolution of satisfaction"""
-    query = """
+def _filtered_satisfaction_temporal(conn, filters):
+    """Same aggregate as mv_satisfaction_temporal over the filtered fact_orders rows"""
+    where, params = filters.where()
+    query = f"""
     SELECT
-        strftime('%Y-%m', o.order_purchase_timestamp) as month,
-        AVG(orr.review_score) as average_review_score,
-        COUNT(orr.review_id) as total_reviews
-    FROM order_reviews orr
-    JOIN orders o ON orr.order_id = o.order_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY month
-    HAVING COUNT(orr.review_id) > 10
+        printf('%04d-%02d', purchase_year, purchase_month % 100) as month,
+        SUM(review_score * review_count) / SUM(review_count) as average_review_score,
+        SUM(review_count) as total_reviews
+    FROM fact_orders f
+    WHERE {where} AND review_count > 0
+    GROUP BY purchase_month
+    HAVING total_reviews > 10
     ORDER BY month
     """
     
-    return pd.read_sql_query(query, conn)
+    return read_sql(conn, query, params)
\ No newline at end of file
@@ -5,14 +5,16 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from utils.helpers import apply_viridis_style, format_currency, format_number
+from utils.helpers import apply_viridis_style, format_currency, format_number, make_subplots, plotly_chart
+from utils.query_cache import read_sql
+from utils.figure_cache import cached_figure
+from utils.filters import uses_summary_tables
 
-def show_temporal_analysis(conn):
+def show_temporal_analysis(conn, filters=None):
     st.header("⏰ Temporal Sales Analysis")
     
     # Load data
-    df_temporal = get_temporal_data(conn)
+    df_temporal = get_temporal_data(conn, filters)
     
     if df_temporal.empty:
         st.warning("No temporal data found.")
@@ -28,6 +30,11 @@ def show_temporal_analysis(conn):
     # Main evolution chart
     st.subheader("📈 Temporal Evolution")
     
+    fig = cached_figure('temporal', df_temporal, lambda: _build_temporal_figure(df_temporal))
+    plotly_chart(fig, use_container_width=True)
+
+def _build_temporal_figure(df_temporal):
+    """Build the 2x2 revenue/orders/seasonality/customers figure"""
     # Create subplots for comprehensive analysis
     fig = make_subplots(
         rows=2, cols=2,
@@ -140,24 +147,35 @@ def show_temporal_analysis(conn):
         margin=dict(t=120, b=80),  # Adjusted margins for better balance
         title_y=0.95  # Position title closer to the top
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def get_temporal_data(conn, filters=None):
+    """Get data aggregated by month (precomputed in mv_temporal)"""
+    if not uses_summary_tables(filters):
+        return _filtered_temporal_data(conn, filters)
 
-def get_temporal_data(conn):
-    """Get data aggregated by month"""
     query = """
+    SELECT month, total_orders, total_revenue, average_price, unique_customers
+    FROM mv_temporal
+    ORDER BY month
+    """
+    
+    return read_sql(conn, query)
+
+def _filtered_temporal_data(conn, filters):
+    """Same aggregate as mv_temporal over the filtered fact_orders rows"""
+    where, params = filters.where()
+    query = f"""
     SELECT
-        strftime('%Y-%m', o.order_purchase_timestamp) as month,
-        COUNT(DISTINCT o.order_id) as total_orders,
-        SUM(oi.price) as total_revenue,
-        AVG(oi.price) as average_price,
-        COUNT(DISTINCT c.customer_unique_id) as unique_customers
-    FROM orders o
-    JOIN order_items oi ON o.order_id = oi.order_id
-    JOIN customers c ON o.customer_id = c.customer_id
-    WHERE o.order_status = 'delivered'
-    GROUP BY month
+        printf('%04d-%02d', purchase_year, purchase_month % 100) as month,
+        COUNT(*) as total_orders,
+        SUM(item_revenue) as total_revenue,
+        SUM(item_revenue) / SUM(item_count) as average_price,
+        COUNT(DISTINCT customer_unique_id) as unique_customers
+    FROM fact_orders f
+    WHERE {where} AND item_count > 0
+    GROUP BY purchase_month
     ORDER BY month
     """
     
-    return pd.read_sql_query(query, conn)
+    return read_sql(conn, query, params)
\ No newline at end of file
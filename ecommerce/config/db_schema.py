@@ -0,0 +1,452 @@
+"""
+SQLite schema settings applied by the data loader during and after ingestion
+"""
+
+# Explicit table definitions, created before any row is inserted. {table} is
+# replaced by the name the loader writes to. Timestamps are stored as integer
+# Unix epoch seconds. Tables keyed by text use WITHOUT ROWID so rows are
+# stored in primary-key order and lookups need no extra index.
+TABLE_DDL = {
+    'customers': """
+        CREATE TABLE "{table}" (
+            customer_id TEXT PRIMARY KEY,
+            customer_unique_id TEXT NOT NULL,
+            customer_zip_code_prefix INTEGER,
+            customer_city TEXT,
+            customer_state TEXT
+        ) WITHOUT ROWID
+    """,
+    'orders': """
+        CREATE TABLE "{table}" (
+            order_id TEXT PRIMARY KEY,
+            customer_id TEXT NOT NULL,
+            order_status TEXT NOT NULL,
+            order_purchase_timestamp INTEGER,
+            order_approved_at INTEGER,
+            order_delivered_carrier_date INTEGER,
+            order_delivered_customer_date INTEGER,
+            order_estimated_delivery_date INTEGER,
+            purchase_year INTEGER,
+            purchase_month INTEGER
+        ) WITHOUT ROWID
+    """,
+    'order_items': """
+        CREATE TABLE "{table}" (
+            order_id TEXT NOT NULL,
+            order_item_id INTEGER NOT NULL,
+            product_id TEXT NOT NULL,
+            seller_id TEXT,
+            shipping_limit_date INTEGER,
+            price REAL,
+            freight_value REAL,
+            PRIMARY KEY (order_id, order_item_id)
+        ) WITHOUT ROWID
+    """,
+    'order_payments': """
+        CREATE TABLE "{table}" (
+            order_id TEXT NOT NULL,
+            payment_sequential INTEGER NOT NULL,
+            payment_type TEXT,
+            payment_installments INTEGER,
+            payment_value REAL,
+            PRIMARY KEY (order_id, payment_sequential)
+        ) WITHOUT ROWID
+    """,
+    'products': """
+        CREATE TABLE "{table}" (
+            product_id TEXT PRIMARY KEY,
+            product_category_name TEXT
+        ) WITHOUT ROWID
+    """,
+    'sellers': """
+        CREATE TABLE "{table}" (
+            seller_id TEXT PRIMARY KEY,
+            seller_zip_code_prefix INTEGER,
+            seller_city TEXT,
+            seller_state TEXT
+        ) WITHOUT ROWID
+    """,
+    # No natural key: zip prefixes repeat, so keep the implicit rowid
+    'geolocation': """
+        CREATE TABLE "{table}" (
+            geolocation_zip_code_prefix INTEGER,
+            geolocation_lat REAL,
+            geolocation_lng REAL,
+            geolocation_city TEXT,
+            geolocation_state TEXT
+        )
+    """,
+    # review_id alone is not unique in the Olist export
+    'order_reviews': """
+        CREATE TABLE "{table}" (
+            review_id TEXT NOT NULL,
+            order_id TEXT NOT NULL,
+            review_score INTEGER,
+            review_creation_date INTEGER,
+            review_answer_timestamp INTEGER,
+            PRIMARY KEY (review_id, order_id)
+        ) WITHOUT ROWID
+    """,
+    'category_translations': """
+        CREATE TABLE "{table}" (
+            product_category_name TEXT PRIMARY KEY,
+            product_category_name_english TEXT
+        ) WITHOUT ROWID
+    """,
+}
+
+# Columns computed once at load time from a parsed timestamp column:
+# {table: {new column: (source column, 'year' | 'year_month')}}.
+# 'year_month' is the integer YYYYMM, e.g. 201803.
+DERIVED_COLUMNS = {
+    'orders': {
+        'purchase_year': ('order_purchase_timestamp', 'year'),
+        'purchase_month': ('order_purchase_timestamp', 'year_month'),
+    },
+}
+
+# Secondary indexes created on each table once it is loaded, as column
+# tuples. Primary keys in TABLE_DDL already cover order_id, customer_id,
+# product_id and seller_id lookups; these add the remaining join keys and
+# the order_status filter with the monthly grouping column.
+TABLE_INDEXES = {
+    'customers': [
+        ('customer_unique_id',),
+    ],
+    'orders': [
+        ('customer_id',),
+        ('order_status', 'purchase_month'),
+    ],
+    'order_items': [
+        ('product_id',),
+    ],
+    'order_reviews': [
+        ('order_id',),
+    ],
+    # Serve the sidebar filters: status + month range, or state + status +
+    # month range when customer states are selected
+    'fact_orders': [
+        ('order_status', 'purchase_month'),
+        ('customer_state', 'order_status', 'purchase_month'),
+    ],
+}
+
+def get_index_name(table_name, columns):
+    """Deterministic index name for a table and its indexed columns"""
+    return f"idx_{table_name}_{'_'.join(columns)}"
+
+def get_index_statements(table_name):
+    """CREATE INDEX statements declared for a table"""
+    return [
+        f'CREATE INDEX IF NOT EXISTS "{get_index_name(table_name, columns)}" '
+        f'ON "{table_name}" ({", ".join(columns)})'
+        for columns in TABLE_INDEXES.get(table_name, [])
+    ]
+
+# Summary tables built right after ingestion, in this order. Each is rebuilt
+# whenever one of its sources (base tables or earlier summary tables) is
+# rebuilt or its SQL changes. An optional 'ddl' creates the table with
+# explicit types and keys before the SELECT is inserted into it.
+#
+# {scope} in the SQL is '1' for a full build. An incremental refresh only
+# recomputes the groups touched by the orders listed in temp.changed_orders;
+# 'refresh' says how to find them:
+#   'keys':   query returning the group keys of those orders
+#   'key':    expression giving that key for a source row ({scope} filters on it)
+#   'column': expression giving the key for a row of the summary table
+MATERIALIZED_VIEWS = {
+    # One row per order with everything the sections aggregate, so the
+    # orders/customers/items/payments/reviews joins run once per build
+    # instead of on every section query. Item and review fan-out is
+    # collapsed here: each order counts once.
+    'fact_orders': {
+        'sources': ['orders', 'customers', 'order_items', 'order_payments', 'order_reviews'],
+        'refresh': {
+            'keys': "SELECT order_id FROM temp.changed_orders",
+            'key': "order_id",
+            'column': "order_id"
+        },
+        'ddl': """
+            CREATE TABLE "{table}" (
+                order_id TEXT PRIMARY KEY,
+                customer_id TEXT NOT NULL,
+                customer_unique_id TEXT,
+                customer_state TEXT,
+                order_status TEXT NOT NULL,
+                order_purchase_timestamp INTEGER,
+                purchase_year INTEGER,
+                purchase_month INTEGER,
+                item_count INTEGER NOT NULL,
+                item_revenue REAL NOT NULL,
+                freight_total REAL NOT NULL,
+                payment_count INTEGER NOT NULL,
+                payment_total REAL NOT NULL,
+                dominant_payment_type TEXT,
+                review_count INTEGER NOT NULL,
+                review_score REAL
+            ) WITHOUT ROWID
+        """,
+        'sql': """
+            SELECT
+                o.order_id,
+                o.customer_id,
+                c.customer_unique_id,
+                c.customer_state,
+                o.order_status,
+                o.order_purchase_timestamp,
+                o.purchase_year,
+                o.purchase_month,
+                COALESCE(i.item_count, 0),
+                COALESCE(i.item_revenue, 0),
+                COALESCE(i.freight_total, 0),
+                COALESCE(p.payment_count, 0),
+                COALESCE(p.payment_total, 0),
+                p.dominant_payment_type,
+                COALESCE(r.review_count, 0),
+                r.review_score
+            FROM (SELECT * FROM orders WHERE {scope}) o
+            LEFT JOIN customers c ON c.customer_id = o.customer_id
+            LEFT JOIN (
+                SELECT
+                    order_id,
+                    COUNT(*) as item_count,
+                    SUM(price) as item_revenue,
+                    SUM(freight_value) as freight_total
+                FROM order_items
+                WHERE {scope}
+                GROUP BY order_id
+            ) i ON i.order_id = o.order_id
+            LEFT JOIN (
+                -- payment_type is taken from the row holding MAX(type_value),
+                -- i.e. the method that paid the largest share of the order
+                SELECT
+                    order_id,
+                    SUM(type_count) as payment_count,
+                    SUM(type_value) as payment_total,
+                    payment_type as dominant_payment_type,
+                    MAX(type_value) as dominant_value
+                FROM (
+                    SELECT order_id, payment_type, COUNT(*) as type_count, SUM(payment_value) as type_value
+                    FROM order_payments
+                    WHERE {scope}
+                    GROUP BY order_id, payment_type
+                )
+                GROUP BY order_id
+            ) p ON p.order_id = o.order_id
+            LEFT JOIN (
+                SELECT order_id, COUNT(*) as review_count, AVG(review_score) as review_score
+                FROM order_reviews
+                WHERE {scope}
+                GROUP BY order_id
+            ) r ON r.order_id = o.order_id
+        """
+    },
+    # Single row of overview KPIs, so the page never counts the catalogue
+    # and review tables at request time. Unique customers and the review
+    # score cover every customer and review; only a filtered dashboard
+    # scopes them to the selected orders (components/overview.py).
+    'mv_overview': {
+        'sources': ['fact_orders', 'customers', 'products', 'sellers', 'order_reviews'],
+        'sql': """
+            SELECT
+                d.total_orders,
+                (SELECT COUNT(DISTINCT customer_unique_id) FROM customers) as unique_customers,
+                d.total_revenue,
+                (SELECT COUNT(*) FROM products) as unique_products,
+                (SELECT COUNT(*) FROM sellers) as active_sellers,
+                d.avg_ticket,
+                (SELECT COALESCE(AVG(review_score), 0) FROM order_reviews) as avg_review_score
+            FROM (
+                SELECT
+                    COUNT(*) as total_orders,
+                    COALESCE(SUM(item_revenue), 0) as total_revenue,
+                    COALESCE(AVG(CASE WHEN item_count > 0 THEN item_revenue END), 0) as avg_ticket
+                FROM fact_orders
+                WHERE order_status = 'delivered' AND {scope}
+            ) d
+        """
+    },
+    'mv_sales_by_state': {
+        'sources': ['fact_orders'],
+        'refresh': {
+            'keys': "SELECT customer_state FROM fact_orders WHERE order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "customer_state",
+            'column': "state"
+        },
+        'sql': """
+            SELECT
+                customer_state as state,
+                COUNT(*) as total_orders,
+                SUM(item_revenue) as total_revenue,
+                SUM(item_revenue) / SUM(item_count) as average_price
+            FROM fact_orders
+            WHERE order_status = 'delivered' AND item_count > 0 AND {scope}
+            GROUP BY customer_state
+        """
+    },
+    'mv_temporal': {
+        'sources': ['fact_orders'],
+        'refresh': {
+            'keys': "SELECT purchase_month FROM fact_orders WHERE order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "purchase_month",
+            'column': "CAST(REPLACE(month, '-', '') AS INTEGER)"
+        },
+        'sql': """
+            SELECT
+                printf('%04d-%02d', purchase_year, purchase_month % 100) as month,
+                COUNT(*) as total_orders,
+                SUM(item_revenue) as total_revenue,
+                SUM(item_revenue) / SUM(item_count) as average_price,
+                COUNT(DISTINCT customer_unique_id) as unique_customers
+            FROM fact_orders
+            WHERE order_status = 'delivered' AND item_count > 0 AND {scope}
+            GROUP BY purchase_month
+        """
+    },
+    # Per-transaction grain, so payments are still read individually;
+    # fact_orders supplies the delivered filter
+    'mv_payments': {
+        'sources': ['fact_orders', 'order_payments'],
+        'refresh': {
+            'keys': "SELECT CASE WHEN op.payment_type = 'boleto' THEN 'bank_slip' ELSE op.payment_type END FROM order_payments op WHERE op.order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "CASE WHEN op.payment_type = 'boleto' THEN 'bank_slip' ELSE op.payment_type END",
+            'column': "payment_method"
+        },
+        'sql': """
+            SELECT
+                CASE
+                    WHEN op.payment_type = 'boleto' THEN 'bank_slip'
+                    ELSE op.payment_type
+                END as payment_method,
+                COUNT(*) as total_transactions,
+                SUM(op.payment_value) as total_value,
+                AVG(op.payment_value) as average_value,
+                COUNT(DISTINCT op.order_id) as unique_orders
+            FROM order_payments op
+            JOIN fact_orders f ON op.order_id = f.order_id
+            WHERE f.order_status = 'delivered' AND {scope}
+            GROUP BY payment_method
+        """
+    },
+    # Per-item grain for products; category names are translated here once
+    # instead of merging in pandas
+    'mv_categories': {
+        'sources': ['fact_orders', 'order_items', 'products', 'category_translations'],
+        'refresh': {
+            'keys': "SELECT COALESCE(t.product_category_name_english, p.product_category_name) FROM order_items oi JOIN products p ON oi.product_id = p.product_id LEFT JOIN category_translations t ON t.product_category_name = p.product_category_name WHERE oi.order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "COALESCE(t.product_category_name_english, p.product_category_name)",
+            'column': "category"
+        },
+        'sql': """
+            SELECT
+                COALESCE(t.product_category_name_english, p.product_category_name) as category,
+                COUNT(DISTINCT oi.order_id) as total_orders,
+                SUM(oi.price) as total_revenue,
+                AVG(oi.price) as average_price,
+                COUNT(DISTINCT oi.product_id) as unique_products
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.product_id
+            JOIN fact_orders f ON oi.order_id = f.order_id
+            LEFT JOIN category_translations t ON t.product_category_name = p.product_category_name
+            WHERE f.order_status = 'delivered' AND {scope}
+            GROUP BY p.product_category_name
+        """
+    },
+    # One row per review, each counted once per item of its order like the
+    # original reviews x items join, so counts and thresholds are unchanged
+    'mv_satisfaction': {
+        'sources': ['fact_orders', 'order_reviews'],
+        'refresh': {
+            'keys': "SELECT review_score FROM order_reviews WHERE order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "r.review_score",
+            'column': "review_score"
+        },
+        'sql': """
+            SELECT
+                r.review_score,
+                SUM(f.item_count) as total_reviews,
+                SUM(f.item_revenue) / SUM(f.item_count) as average_order_price,
+                SUM(f.freight_total) / SUM(f.item_count) as average_shipping_cost
+            FROM fact_orders f
+            JOIN order_reviews r ON r.order_id = f.order_id
+            WHERE f.order_status = 'delivered' AND f.item_count > 0 AND {scope}
+            GROUP BY r.review_score
+        """
+    },
+    # Weighted by reviews x items per order, as in the original join
+    'mv_satisfaction_by_state': {
+        'sources': ['fact_orders'],
+        'refresh': {
+            'keys': "SELECT customer_state FROM fact_orders WHERE order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "customer_state",
+            'column': "state"
+        },
+        'sql': """
+            SELECT
+                customer_state as state,
+                SUM(review_score * review_count * item_count) / SUM(review_count * item_count) as average_review_score,
+                SUM(review_count * item_count) as total_reviews,
+                SUM(item_revenue * review_count) / SUM(item_count * review_count) as average_order_price
+            FROM fact_orders
+            WHERE order_status = 'delivered' AND review_count > 0 AND item_count > 0 AND {scope}
+            GROUP BY customer_state
+        """
+    },
+    # Choices and date bounds for the sidebar filters
+    'mv_filter_options': {
+        'sources': ['fact_orders'],
+        'refresh': {
+            'keys': "SELECT customer_state FROM fact_orders WHERE order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "customer_state",
+            'column': "customer_state"
+        },
+        'sql': """
+            SELECT
+                order_status,
+                customer_state,
+                COUNT(*) as total_orders,
+                MIN(order_purchase_timestamp) as first_purchase,
+                MAX(order_purchase_timestamp) as last_purchase
+            FROM fact_orders
+            WHERE {scope}
+            GROUP BY order_status, customer_state
+        """
+    },
+    'mv_satisfaction_temporal': {
+        'sources': ['fact_orders'],
+        'refresh': {
+            'keys': "SELECT purchase_month FROM fact_orders WHERE order_id IN (SELECT order_id FROM temp.changed_orders)",
+            'key': "purchase_month",
+            'column': "CAST(REPLACE(month, '-', '') AS INTEGER)"
+        },
+        'sql': """
+            SELECT
+                printf('%04d-%02d', purchase_year, purchase_month % 100) as month,
+                SUM(review_score * review_count) / SUM(review_count) as average_review_score,
+                SUM(review_count) as total_reviews
+            FROM fact_orders
+            WHERE order_status = 'delivered' AND review_count > 0 AND {scope}
+            GROUP BY purchase_month
+        """
+    },
+}
+
+# How refresh_database() brings a table up to date without reloading it:
+#   'append': the export only grows; rows after the byte offset recorded at
+#             the last load are new (the old part must hash the same)
+#   'upsert': rows change in place; rows whose 'watermark' column is within
+#             'lookback_days' of the recorded high-water mark are re-read and
+#             the new, changed or removed ones synced by primary key. Older
+#             rows are only checked against a recorded count and hash
+# Any other change to a source file falls back to a full load.
+INCREMENTAL_TABLES = {
+    'orders': {'mode': 'upsert', 'watermark': 'order_purchase_timestamp', 'lookback_days': 60},
+    'customers': {'mode': 'append'},
+    'order_items': {'mode': 'append'},
+    'order_payments': {'mode': 'append'},
+    'order_reviews': {'mode': 'append'},
+    'products': {'mode': 'append'},
+    'sellers': {'mode': 'append'},
+    'geolocation': {'mode': 'append'},
+    'category_translations': {'mode': 'append'},
+}
@@ -2,6 +2,7 @@
 Google Drive configuration for CSV files
 Replace with your actual file IDs
 """
+import os
 
 # Dictionary with file IDs from Google Drive
 CSV_FILE_IDS = {
@@ -16,6 +17,130 @@ CSV_FILE_IDS = {
     'category_translations': '1X_437Ajwkcy2PmQnkDNvCjWL4ycv7XMN'
 }
 
+# Timestamp format used by every date column in the Olist exports
+OLIST_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Parsing schema for each CSV: declared dtypes (categoricals for low-cardinality
+# columns), the timestamp columns to parse and the columns to keep. Anything
+# not listed in usecols is dropped at parse time.
+CSV_SCHEMAS = {
+    'customers': {
+        'usecols': ['customer_id', 'customer_unique_id', 'customer_zip_code_prefix',
+                    'customer_city', 'customer_state'],
+        'dtype': {
+            'customer_id': str,
+            'customer_unique_id': str,
+            'customer_zip_code_prefix': 'int32',
+            'customer_city': 'category',
+            'customer_state': 'category'
+        }
+    },
+    'orders': {
+        'usecols': ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp',
+                    'order_approved_at', 'order_delivered_carrier_date',
+                    'order_delivered_customer_date', 'order_estimated_delivery_date'],
+        'dtype': {
+            'order_id': str,
+            'customer_id': str,
+            'order_status': 'category'
+        },
+        'parse_dates': ['order_purchase_timestamp', 'order_approved_at',
+                        'order_delivered_carrier_date', 'order_delivered_customer_date',
+                        'order_estimated_delivery_date']
+    },
+    'order_items': {
+        'usecols': ['order_id', 'order_item_id', 'product_id', 'seller_id',
+                    'shipping_limit_date', 'price', 'freight_value'],
+        'dtype': {
+            'order_id': str,
+            'order_item_id': 'int16',
+            'product_id': str,
+            'seller_id': str,
+            'price': 'float64',
+            'freight_value': 'float64'
+        },
+        'parse_dates': ['shipping_limit_date']
+    },
+    'order_payments': {
+        'usecols': ['order_id', 'payment_sequential', 'payment_type',
+                    'payment_installments', 'payment_value'],
+        'dtype': {
+            'order_id': str,
+            'payment_sequential': 'int16',
+            'payment_type': 'category',
+            'payment_installments': 'int16',
+            'payment_value': 'float64'
+        }
+    },
+    'products': {
+        'usecols': ['product_id', 'product_category_name'],
+        'dtype': {
+            'product_id': str,
+            'product_category_name': 'category'
+        }
+    },
+    'sellers': {
+        'usecols': ['seller_id', 'seller_zip_code_prefix', 'seller_city', 'seller_state'],
+        'dtype': {
+            'seller_id': str,
+            'seller_zip_code_prefix': 'int32',
+            'seller_city': 'category',
+            'seller_state': 'category'
+        }
+    },
+    'geolocation': {
+        'usecols': ['geolocation_zip_code_prefix', 'geolocation_lat', 'geolocation_lng',
+                    'geolocation_city', 'geolocation_state'],
+        'dtype': {
+            'geolocation_zip_code_prefix': 'int32',
+            'geolocation_lat': 'float64',
+            'geolocation_lng': 'float64',
+            'geolocation_city': 'category',
+            'geolocation_state': 'category'
+        }
+    },
+    'order_reviews': {
+        # Free-text comment columns are not used by the dashboard
+        'usecols': ['review_id', 'order_id', 'review_score',
+                    'review_creation_date', 'review_answer_timestamp'],
+        'dtype': {
+            'review_id': str,
+            'order_id': str,
+            'review_score': 'int8'
+        },
+        'parse_dates': ['review_creation_date', 'review_answer_timestamp']
+    },
+    'category_translations': {
+        'usecols': ['product_category_name', 'product_category_name_english'],
+        'dtype': {
+            'product_category_name': str,
+            'product_category_name_english': str
+        }
+    }
+}
+
+def get_csv_read_options(table_name):
+    """Return the pd.read_csv keyword arguments declared for a table"""
+    schema = CSV_SCHEMAS.get(table_name, {})
+    options = dict(schema)
+    if schema.get('parse_dates'):
+        options['date_format'] = OLIST_DATE_FORMAT
+    return options
+
+# Local cache for raw downloads (relative to the working directory)
+DOWNLOAD_CACHE_DIR = '.cache/downloads'
+
+# Seconds a cached download is trusted without asking Google Drive again.
+# After that it is revalidated with a conditional request (ETag/Last-Modified).
+DOWNLOAD_CACHE_TTL = 24 * 60 * 60
+
+# Network timeout in seconds for a single download
+DOWNLOAD_TIMEOUT = 60
+
+# Directory with local <table>.csv files (e.g. from tools/generate_dataset.py).
+# When set, the loader reads these instead of downloading from Google Drive.
+LOCAL_DATA_DIR = os.environ.get('OLIST_DATA_DIR')
+
 def get_direct_download_url(file_id):
     """Generate direct download URL from Google Drive"""
     return f"https://drive.google.com/uc?export=download&id={file_id}"
@@ -23,4 +148,9 @@ def get_direct_download_url(file_id):
 def get_file_urls():
     """Return dictionary with complete URLs for each file"""
     return {name: get_direct_download_url(file_id) 
-            for name, file_id in CSV_FILE_IDS.items()}
\ No newline at end of file
+            for name, file_id in CSV_FILE_IDS.items()}
+
+def get_local_paths(directory):
+    """Return dictionary with the local CSV path for each file"""
+    return {name: os.path.join(directory, f"{name}.csv")
+            for name in CSV_FILE_IDS}
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Performance tuning settings for data loading and querying
+"""
+import os
+
+# Number of worker threads that download and parse CSV files concurrently.
+# SQLite inserts are always serialized on a single writer thread.
+LOAD_MAX_WORKERS = 4
+
+# Tables submitted to the worker pool first. These are the largest downloads,
+# so starting them early keeps the total load close to the slowest table.
+LOAD_PRIORITY = ['geolocation', 'order_items', 'order_reviews', 'orders']
+
+# Rows per CSV chunk during streaming ingestion
+LOAD_CHUNK_ROWS = 50_000
+
+# Parsed chunks allowed to wait for the writer. Workers block once the queue
+# is full, which keeps memory flat regardless of file size.
+LOAD_QUEUE_CHUNKS = 8
+
+# PRAGMAs applied to the temporary build database while it is being loaded.
+# The build file is swapped in only after validation, so durability during
+# the load is not needed.
+LOAD_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'cache_size': -64000,  # negative = KiB, i.e. ~64 MB
+    'temp_store': 'MEMORY'
+}
+
+# Memory budget in bytes for cached section query results (least recently
+# used entries are evicted first)
+QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Read-only connections kept open for reuse across reruns. Threads beyond
+# this get a temporary connection that is closed when released.
+READ_POOL_SIZE = 8
+
+# Open readers with immutable=1. Safe because the loader never modifies the
+# live file in place: rebuilds are swapped in under a new inode, and pooled
+# connections reopen when they notice the swap.
+READ_IMMUTABLE = True
+
+# PRAGMAs applied once to every pooled read connection
+READ_PRAGMAS = {
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32000,  # negative = KiB, i.e. ~32 MB
+    'temp_store': 'MEMORY'
+}
+
+# Read hot tables and their indexes once after the database is loaded, so the
+# first reruns after a restart are served from warm caches
+WARMUP_ON_START = True
+
+# Tables touched by the warm-up; None means every materialized view
+# (fact_orders and the mv_ summary tables)
+WARMUP_TABLES = None
+
+# Record timings for SQL, figure builds and chart renders
+PERF_ENABLED = True
+
+# Recent samples kept per section and per operation for the rolling p50/p95
+PERF_WINDOW = 200
+
+# Also run every section query through EXPLAIN QUERY PLAN and store the plan
+# with its timing. Off by default; enable with DASHBOARD_EXPLAIN=1.
+EXPLAIN_QUERIES = os.environ.get('DASHBOARD_EXPLAIN') == '1'
+
+# Tables small enough that a full scan (and sorting it) is expected
+EXPLAIN_SCAN_OK_PREFIXES = ('mv_',)
+
+# Benchmark regression gate: allowed slowdown of the median, in percent, per
+# benchmark kind. A change must also exceed the run-to-run noise (the IQRs of
+# the two runs added up) and BENCH_MIN_DELTA_MS to count as a regression.
+BENCH_REGRESSION_PCT = {
+    'ingest': 15,
+    'query': 25,
+    'figure': 15
+}
+BENCH_MIN_DELTA_MS = 1.0
+# Fewer query/figure samples than this give an IQR too unstable to gate on
+BENCH_MIN_REPEAT = 5
+
+# Memory budget in bytes for built Plotly figures reused across reruns
+# (charged from each figure's serialized size; least recently used evicted first)
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# After a section renders, warm the queries of the other sections on a small
+# background pool so the next click is served from the result cache
+PREFETCH_ENABLED = True
+
+# Background threads (and so pooled connections) used by the prefetcher
+PREFETCH_WORKERS = 2
+
+# Load with DataLoader.refresh_database(): read only the rows added to the
+# sources since the last load (see INCREMENTAL_TABLES in db_schema) and fall
+# back to a full rebuild when that is not possible. Enable with
+# DASHBOARD_INCREMENTAL=1.
+LOAD_INCREMENTAL = os.environ.get('DASHBOARD_INCREMENTAL') == '1'
@@ -1,61 +1,1118 @@
 """
 Module for loading and managing data from Google Drive to SQLite - CORREGIDO
 """
+import hashlib
+import os
+import queue
 import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import streamlit as st
-from config.gdrive_config import get_file_urls
+from config.gdrive_config import get_file_urls, get_local_paths, get_csv_read_options, LOCAL_DATA_DIR
+from config.performance_config import (
+    LOAD_MAX_WORKERS, LOAD_PRIORITY, LOAD_CHUNK_ROWS, LOAD_QUEUE_CHUNKS, LOAD_PRAGMAS,
+    READ_POOL_SIZE, READ_IMMUTABLE, READ_PRAGMAS, WARMUP_ON_START, WARMUP_TABLES, LOAD_INCREMENTAL
+)
+from config.db_schema import (
+    TABLE_DDL, DERIVED_COLUMNS, TABLE_INDEXES, MATERIALIZED_VIEWS, INCREMENTAL_TABLES,
+    get_index_name, get_index_statements
+)
+from utils.download_cache import DownloadCache
+from utils.query_cache import query_cache
+from utils.figure_cache import figure_cache
+from utils.prefetch import prefetcher
+
+# Bump whenever the way tables are built changes, to force a full rebuild
+SCHEMA_VERSION = 6
+
+# Table that records how each table in the database was built
+MANIFEST_TABLE = '_manifest'
+MANIFEST_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+        table_name TEXT PRIMARY KEY,
+        source_sha256 TEXT NOT NULL,
+        schema_version INTEGER NOT NULL,
+        built_at REAL NOT NULL,
+        row_count INTEGER NOT NULL
+    )
+"""
+
+# How far each table's source file has been read: its size and hash at the
+# last load, and the latest value of its INCREMENTAL_TABLES watermark column.
+# Upserted tables also record the rows an incremental refresh does not
+# re-read (watermark NULL or before settled_before) by count and hash, so a
+# change to them is detected instead of silently kept.
+WATERMARKS_TABLE = '_watermarks'
+WATERMARKS_COLUMNS = (
+    'table_name', 'byte_offset', 'prefix_sha256', 'high_water',
+    'settled_before', 'settled_rows', 'settled_sha256', 'updated_at'
+)
+WATERMARKS_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {WATERMARKS_TABLE} (
+        table_name TEXT PRIMARY KEY,
+        byte_offset INTEGER NOT NULL,
+        prefix_sha256 TEXT NOT NULL,
+        high_water INTEGER,
+        settled_before INTEGER,
+        settled_rows INTEGER,
+        settled_sha256 TEXT,
+        updated_at REAL NOT NULL
+    )
+"""
+
+# Tables whose new rows are tracked per order in temp.changed_orders during
+# an incremental refresh. A summary table reading any other changed source
+# is recomputed in full.
+ORDER_KEYED_TABLES = ('orders', 'customers', 'order_items', 'order_payments', 'order_reviews')
 
 class DataLoader:
-    def __init__(self, db_name='ecommerce.db'):
+    def __init__(self, db_name='ecommerce.db', max_workers=LOAD_MAX_WORKERS,
+                 pool_size=READ_POOL_SIZE, immutable=READ_IMMUTABLE, read_pragmas=None,
+                 source_dir=LOCAL_DATA_DIR):
         self.db_name = db_name
-        self.file_urls = get_file_urls()
+        # Local CSVs (offline / synthetic data) or the Google Drive exports
+        self.file_urls = get_local_paths(source_dir) if source_dir else get_file_urls()
+        self.max_workers = max(1, int(max_workers))
+        self.download_cache = DownloadCache()
+        self.pool_size = max(1, int(pool_size))
+        self.immutable = immutable
+        # mmap_size, cache_size, temp_store... applied to every read connection
+        self.read_pragmas = dict(READ_PRAGMAS if read_pragmas is None else read_pragmas)
+        self.last_warmup = None
+        # Read connection pool: entries checked out per thread plus idle ones
+        self._pool_lock = threading.Lock()
+        self._checked_out = {}
+        self._idle = []
+        self._pooled_count = 0
+        self._pool_stats = {'opened': 0, 'reused': 0, 'reopened': 0}
+
+    def _stream_table(self, table_name, url, manifest, chunk_queue, stop):
+        """Download (or reuse the cached copy of) a CSV and stream it in chunks.
+
+        Runs on the worker pool. Every message goes through chunk_queue to the
+        writer thread:
+          ('chunk', table, DataFrame, fraction of the file read)
+          ('done', table, cached_file)
+          ('reused', table, cached_file) when the manifest is already current
+          ('failed', table, error message)
+        """
+        try:
+            cached_file = self.download_cache.fetch(url)
+            if self._is_up_to_date(manifest.get(table_name), cached_file):
+                self._put(chunk_queue, ('reused', table_name, cached_file), stop)
+                return
+            with open(cached_file.path, 'rb') as f:
+                reader = pd.read_csv(f, chunksize=LOAD_CHUNK_ROWS, **get_csv_read_options(table_name))
+                for chunk in reader:
+                    chunk = self._derive_columns(table_name, chunk)
+                    fraction = f.tell() / cached_file.size if cached_file.size else 1
+                    if not self._put(chunk_queue, ('chunk', table_name, chunk, fraction), stop):
+                        return
+            self._put(chunk_queue, ('done', table_name, cached_file), stop)
+        except Exception as e:
+            self._put(chunk_queue, ('failed', table_name, str(e)), stop)
+
+    @staticmethod
+    def _put(chunk_queue, message, stop):
+        """Blocking put that gives up once the writer has stopped"""
+        while not stop.is_set():
+            try:
+                chunk_queue.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _is_up_to_date(manifest_row, cached_file):
+        return (
+            manifest_row is not None
+            and manifest_row['source_sha256'] == cached_file.sha256
+            and manifest_row['schema_version'] == SCHEMA_VERSION
+        )
+
+    def read_manifest(self, conn):
+        """Return {table_name: manifest row} for the tables present in the database"""
+        existing_tables = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        if MANIFEST_TABLE not in existing_tables:
+            return {}
+        manifest = {}
+        for table_name, source_sha256, schema_version, built_at, row_count in conn.execute(
+            f"SELECT table_name, source_sha256, schema_version, built_at, row_count FROM {MANIFEST_TABLE}"
+        ):
+            # Ignore entries whose table was dropped behind our back
+            if table_name in existing_tables:
+                manifest[table_name] = {
+                    'source_sha256': source_sha256,
+                    'schema_version': schema_version,
+                    'built_at': built_at,
+                    'row_count': row_count
+                }
+        return manifest
+
+    def _write_manifest_row(self, conn, table_name, source_sha256, row_count):
+        conn.execute(
+            f"INSERT OR REPLACE INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?)",
+            (table_name, source_sha256, SCHEMA_VERSION, time.time(), row_count)
+        )
+
+    def _open_build(self):
+        """Create the temporary database a rebuild is written to.
+
+        It lives next to the live file (so the final rename stays on the same
+        filesystem) and starts as a copy of the current snapshot, so tables
+        that are not rebuilt carry over unchanged. LOAD_PRAGMAS are applied
+        for the duration of the load.
+        """
+        db_dir = os.path.dirname(os.path.abspath(self.db_name))
+        fd, build_path = tempfile.mkstemp(
+            dir=db_dir, prefix=os.path.basename(self.db_name) + '.', suffix='.building'
+        )
+        os.close(fd)
+        build_conn = sqlite3.connect(build_path, isolation_level=None)
+        if os.path.exists(self.db_name):
+            live_conn = sqlite3.connect(f"file:{os.path.abspath(self.db_name)}?mode=ro", uri=True)
+            try:
+                live_conn.backup(build_conn)
+            finally:
+                live_conn.close()
+        for pragma, value in LOAD_PRAGMAS.items():
+            build_conn.execute(f"PRAGMA {pragma} = {value}")
+        build_conn.execute(MANIFEST_DDL)
+        watermark_columns = tuple(row[1] for row in build_conn.execute(f"PRAGMA table_info({WATERMARKS_TABLE})"))
+        if watermark_columns and watermark_columns != WATERMARKS_COLUMNS:
+            build_conn.execute(f"DROP TABLE {WATERMARKS_TABLE}")  # written by an older version
+        build_conn.execute(WATERMARKS_DDL)
+        return build_conn, build_path
+
+    def _publish_build(self, build_conn, build_path):
+        """Flush the build database to disk and rename it over the live file.
+
+        PRAGMA user_version is bumped as the snapshot generation, which
+        invalidates cached query results computed from the previous data.
+        """
+        generation = build_conn.execute("PRAGMA user_version").fetchone()[0] + 1
+        build_conn.execute(f"PRAGMA user_version = {generation}")
+        build_conn.execute("PRAGMA journal_mode = DELETE")
+        build_conn.close()
+        with open(build_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(build_path, self.db_name)
+        # Queued prefetches target the old generation
+        prefetcher.cancel()
+
+    @staticmethod
+    def _staging_name(table_name):
+        return f"{table_name}__loading"
+
+    def _begin_table(self, build_conn, table_name, chunk):
+        """Create an empty staging table from TABLE_DDL (or shaped like the first chunk)"""
+        staging = self._staging_name(table_name)
+        build_conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        if table_name in TABLE_DDL:
+            build_conn.execute(TABLE_DDL[table_name].format(table=staging))
+        else:
+            build_conn.execute(pd.io.sql.get_schema(chunk, staging, con=build_conn))
+        return self._insert_sql(staging, chunk.columns)
+
+    @staticmethod
+    def _insert_sql(table_name, columns):
+        names = ', '.join(f'"{column}"' for column in columns)
+        placeholders = ', '.join('?' * len(columns))
+        # Duplicate keys in the export keep the last row instead of failing the load
+        return f'INSERT OR REPLACE INTO "{table_name}" ({names}) VALUES ({placeholders})'
+
+    @staticmethod
+    def _derive_columns(table_name, chunk):
+        """Add the DERIVED_COLUMNS declared for a table to a parsed chunk"""
+        for column, (source, kind) in DERIVED_COLUMNS.get(table_name, {}).items():
+            timestamps = chunk[source]
+            if kind == 'year':
+                chunk[column] = timestamps.dt.year.astype('Int64')
+            elif kind == 'year_month':
+                chunk[column] = (timestamps.dt.year * 100 + timestamps.dt.month).astype('Int64')
+            else:
+                raise ValueError(f"Unknown derived column kind: {kind}")
+        return chunk
+
+    @staticmethod
+    def _chunk_rows(chunk):
+        """Convert a DataFrame chunk into plain Python tuples for executemany.
+
+        Timestamps become integer Unix epoch seconds and missing values None.
+        """
+        columns = []
+        for _, column in chunk.items():
+            if pd.api.types.is_datetime64_any_dtype(column):
+                column = ((column - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).astype('Int64')
+            column = column.astype(object)
+            columns.append(column.where(column.notna(), None).tolist())
+        return list(zip(*columns))
+
+    def _finish_table(self, build_conn, table_name, cached_file):
+        """Replace the live table with its staging copy and record it"""
+        build_conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        build_conn.execute(f'ALTER TABLE "{self._staging_name(table_name)}" RENAME TO "{table_name}"')
+        row_count = build_conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+        self._write_manifest_row(build_conn, table_name, cached_file.sha256, row_count)
+        self._write_watermark(build_conn, table_name, cached_file)
+
+    def read_watermarks(self, conn):
+        """Return {table_name: watermark row} as recorded at each table's last load"""
+        columns = tuple(row[1] for row in conn.execute(f"PRAGMA table_info({WATERMARKS_TABLE})"))
+        if columns != WATERMARKS_COLUMNS:
+            return {}  # none yet, or written by an older version
+        names = WATERMARKS_COLUMNS[1:-1]
+        return {
+            row[0]: dict(zip(names, row[1:]))
+            for row in conn.execute(f"SELECT table_name, {', '.join(names)} FROM {WATERMARKS_TABLE}")
+        }
+
+    def _write_watermark(self, conn, table_name, cached_file, verified=None):
+        """Record that the whole source file is loaded, and the table's high-water mark.
+
+        For upserted tables the rows before the lookback window behind that
+        mark are counted and hashed as well. ``verified`` is the previous
+        watermark when its settled rows were just checked against the file;
+        only the rows between the old and new cutoff are hashed then.
+        """
+        spec = INCREMENTAL_TABLES.get(table_name, {})
+        column = spec.get('watermark')
+        high_water = settled_before = settled_rows = settled_sha256 = None
+        if column is not None:
+            high_water = conn.execute(f'SELECT MAX("{column}") FROM "{table_name}"').fetchone()[0]
+        if spec.get('mode') == 'upsert':
+            settled_before = (high_water or 0) - spec['lookback_days'] * 86400
+            if verified is None:
+                settled_rows, settled_sha256 = self._rows_digest(conn.execute(
+                    f'SELECT * FROM "{table_name}" WHERE "{column}" IS NULL OR "{column}" < ?', (settled_before,)
+                ))
+            else:
+                # The digest is a sum of row hashes: add the rows that settled
+                # since (or take back the ones no longer settled)
+                low, high = sorted((verified['settled_before'], settled_before))
+                sign = 1 if settled_before >= verified['settled_before'] else -1
+                moved_rows, moved_total = 0, 0
+                for row in conn.execute(
+                    f'SELECT * FROM "{table_name}" WHERE "{column}" >= ? AND "{column}" < ?', (low, high)
+                ):
+                    moved_rows += 1
+                    moved_total += self._row_hash(row)
+                settled_rows, settled_sha256 = self._digest(
+                    verified['settled_rows'] + sign * moved_rows,
+                    int(verified['settled_sha256'], 16) + sign * moved_total
+                )
+        conn.execute(
+            f"INSERT OR REPLACE INTO {WATERMARKS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (table_name, cached_file.size, cached_file.sha256, high_water,
+             settled_before, settled_rows, settled_sha256, time.time())
+        )
+
+    @staticmethod
+    def _row_hash(row):
+        return int.from_bytes(hashlib.sha256(repr(row).encode('utf-8')).digest()[:16], 'big')
+
+    @classmethod
+    def _rows_digest(cls, rows):
+        """(count, hash) of row tuples that does not depend on their order.
+
+        Rows must hold plain Python values, as _chunk_rows produces and
+        sqlite3 returns them, so a parsed file and a table compare equal.
+        """
+        count = total = 0
+        for row in rows:
+            count += 1
+            total += cls._row_hash(row)
+        return cls._digest(count, total)
+
+    @staticmethod
+    def _digest(count, total):
+        return count, format(total % (1 << 128), '032x')
+
+    def _missing_indexes(self, conn):
+        """Declared indexes (on tables that exist) not present in the database"""
+        existing = {
+            name: table for name, table in conn.execute(
+                "SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"
+            )
+        }
+        return [
+            get_index_name(table_name, columns)
+            for table_name, specs in TABLE_INDEXES.items() if table_name in existing
+            for columns in specs if get_index_name(table_name, columns) not in existing
+        ]
+
+    def _create_indexes(self, build_conn):
+        """Create the declared indexes on the tables that exist"""
+        existing_tables = {
+            row[0] for row in build_conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        for table_name in TABLE_INDEXES:
+            if table_name in existing_tables:
+                for statement in get_index_statements(table_name):
+                    build_conn.execute(statement)
+
+    @staticmethod
+    def _view_signature(view_name, manifest):
+        """Hash of a view's SQL and the source files of the tables it reads"""
+        view = MATERIALIZED_VIEWS[view_name]
+        parts = [view['sql']] + [
+            f"{source}:{manifest[source]['source_sha256']}" for source in view['sources']
+        ]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _is_view_stale(self, view_name, manifest):
+        """True when a summary table's SQL or sources changed since it was built"""
+        view = MATERIALIZED_VIEWS[view_name]
+        if any(source not in manifest for source in view['sources']):
+            return False  # a source failed to load; keep what we have
+        row = manifest.get(view_name)
+        return (
+            row is None
+            or row['schema_version'] != SCHEMA_VERSION
+            or row['source_sha256'] != self._view_signature(view_name, manifest)
+        )
+
+    def _stale_views(self, manifest):
+        """Summary tables whose SQL or source tables changed since they were built"""
+        return [view_name for view_name in MATERIALIZED_VIEWS if self._is_view_stale(view_name, manifest)]
+
+    def _refresh_views(self, build_conn):
+        """Rebuild the stale summary tables in declaration order; returns their names.
+
+        The manifest is updated as each one is rebuilt, so tables built on
+        top of an earlier summary table (e.g. fact_orders) follow it.
+        """
+        manifest = self.read_manifest(build_conn)
+        refreshed = []
+        for view_name, view in MATERIALIZED_VIEWS.items():
+            if not self._is_view_stale(view_name, manifest):
+                continue
+            signature = self._view_signature(view_name, manifest)
+            build_conn.execute("BEGIN")
+            build_conn.execute(f'DROP TABLE IF EXISTS "{view_name}"')
+            if 'ddl' in view:
+                build_conn.execute(view['ddl'].format(table=view_name))
+                build_conn.execute(f'INSERT INTO "{view_name}" {view["sql"].format(scope="1")}')
+            else:
+                build_conn.execute(f'CREATE TABLE "{view_name}" AS {view["sql"].format(scope="1")}')
+            row_count = build_conn.execute(f'SELECT COUNT(*) FROM "{view_name}"').fetchone()[0]
+            self._write_manifest_row(build_conn, view_name, signature, row_count)
+            build_conn.execute("COMMIT")
+            manifest[view_name] = {
+                'source_sha256': signature,
+                'schema_version': SCHEMA_VERSION,
+                'built_at': time.time(),
+                'row_count': row_count
+            }
+            for statement in get_index_statements(view_name):
+                build_conn.execute(statement)
+            refreshed.append(view_name)
+        return refreshed
+
+    def _validate_build(self, build_conn):
+        """Raise if the freshly built database is not safe to publish"""
+        check = build_conn.execute("PRAGMA quick_check").fetchone()[0]
+        if check != 'ok':
+            raise sqlite3.DatabaseError(f"integrity check failed: {check}")
+        for table_name, row in self.read_manifest(build_conn).items():
+            row_count = build_conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+            if row_count != row['row_count']:
+                raise sqlite3.DatabaseError(
+                    f"{table_name} has {row_count} rows, manifest expects {row['row_count']}"
+                )
+
+    def build_database(self, on_progress=None):
+        """Bring the database up to date with the configured sources.
+
+        Workers on a bounded pool download each source and parse it in chunks
+        of LOAD_CHUNK_ROWS rows; the chunks travel through a bounded queue to
+        the calling thread, which is the only SQLite writer. Each table is
+        inserted with executemany into a staging table and swapped in by
+        name in the same transaction that commits its last chunk. Tables
+        whose source file and schema version match the manifest are reused
+        as-is. Indexes and the MATERIALIZED_VIEWS summary tables whose
+        sources changed are rebuilt afterwards.
+
+        Changed tables are written into a temporary copy of the database that
+        is validated and then atomically renamed over the live file. Open
+        connections keep reading the previous snapshot until they reconnect.
+
+        on_progress(fraction, message) is called from the calling thread
+        after every chunk. Returns a summary dict with loaded, reused, failed
+        and offline tables and the refreshed summary tables (views).
+        """
+        if os.path.exists(self.db_name):
+            live_conn = sqlite3.connect(f"file:{os.path.abspath(self.db_name)}?mode=ro", uri=True)
+            try:
+                manifest = self.read_manifest(live_conn)
+                missing_indexes = self._missing_indexes(live_conn)
+            finally:
+                live_conn.close()
+        else:
+            manifest = {}
+            missing_indexes = []
+
+        summary = {'loaded': [], 'reused': [], 'failed': {}, 'offline': [], 'views': []}
+        report = on_progress or (lambda fraction, message: None)
+        total_files = len(self.file_urls)
+        # Largest tables first so they are not queued behind the small ones
+        ordered_sources = sorted(
+            self.file_urls.items(),
+            key=lambda item: LOAD_PRIORITY.index(item[0]) if item[0] in LOAD_PRIORITY else len(LOAD_PRIORITY)
+        )
+        chunk_queue = queue.Queue(maxsize=LOAD_QUEUE_CHUNKS)
+        stop = threading.Event()
+        table_progress = {}
+        insert_sql = {}
+        row_counts = {}
+        build_conn = build_path = None
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix='csv-loader') as executor:
+                try:
+                    for table_name, url in ordered_sources:
+                        executor.submit(self._stream_table, table_name, url, manifest, chunk_queue, stop)
+                    report(0, f"📋 Downloading {total_files} datasets ({self.max_workers} workers)...")
+
+                    finished = 0
+                    while finished < total_files:
+                        kind, table_name, *payload = chunk_queue.get()
+                        if table_name in summary['failed']:
+                            # Drain whatever the worker still sends for a table that failed
+                            finished += kind in ('done', 'failed')
+                            continue
+                        try:
+                            if kind == 'chunk':
+                                chunk, table_progress[table_name] = payload
+                                if build_conn is None:
+                                    build_conn, build_path = self._open_build()
+                                if not build_conn.in_transaction:
+                                    build_conn.execute("BEGIN")
+                                if table_name not in insert_sql:
+                                    insert_sql[table_name] = self._begin_table(build_conn, table_name, chunk)
+                                    row_counts[table_name] = 0
+                                build_conn.executemany(insert_sql[table_name], self._chunk_rows(chunk))
+                                row_counts[table_name] += len(chunk)
+                                report(
+                                    min(sum(table_progress.values()) / total_files, 1),
+                                    f"📋 Writing {table_name} ({row_counts[table_name]:,} rows)..."
+                                )
+                            elif kind == 'done':
+                                cached_file, = payload
+                                finished += 1
+                                if table_name not in insert_sql:
+                                    raise ValueError("source file contains no rows")
+                                if not build_conn.in_transaction:
+                                    build_conn.execute("BEGIN")
+                                self._finish_table(build_conn, table_name, cached_file)
+                                # Chunks of other tables still streaming in are committed
+                                # with it; they sit in staging tables until their own swap
+                                build_conn.execute("COMMIT")
+                                if cached_file.status == 'offline':
+                                    summary['offline'].append(table_name)
+                                summary['loaded'].append(table_name)
+                            elif kind == 'reused':
+                                cached_file, = payload
+                                finished += 1
+                                table_progress[table_name] = 1
+                                if cached_file.status == 'offline':
+                                    summary['offline'].append(table_name)
+                                summary['reused'].append(table_name)
+                            else:
+                                finished += 1
+                                raise RuntimeError(payload[0])
+                        except Exception as e:
+                            summary['failed'][table_name] = str(e)
+                            if build_conn is not None:
+                                if build_conn.in_transaction:
+                                    build_conn.execute("COMMIT")
+                                build_conn.execute(f'DROP TABLE IF EXISTS "{self._staging_name(table_name)}"')
+                            table_progress[table_name] = 1
+                        report(min(sum(table_progress.values()) / total_files, 1), f"📋 Processed {table_name}")
+                finally:
+                    # Unblock workers if the writer stops early
+                    stop.set()
+
+            if build_conn is None and (missing_indexes or self._stale_views(manifest)):
+                # Data is current but the index spec or a summary table
+                # definition changed: rebuild only those
+                build_conn, build_path = self._open_build()
+
+            if build_conn is not None:
+                report(1, "🗂️ Creating indexes...")
+                self._create_indexes(build_conn)
+                report(1, "🧮 Refreshing summary tables...")
+                summary['views'] = self._refresh_views(build_conn)
+                build_conn.execute("ANALYZE")
+                report(1, "🔎 Validating new database...")
+                self._validate_build(build_conn)
+                self._publish_build(build_conn, build_path)
+                build_conn = build_path = None
+        finally:
+            if build_conn is not None:
+                build_conn.close()
+            if build_path is not None and os.path.exists(build_path):
+                os.remove(build_path)
+
+        return summary
+
+    def refresh_database(self, on_progress=None):
+        """Bring the database up to date reading only what changed since the last load.
+
+        Append-only sources are read from the byte offset recorded at their
+        last load, and orders are upserted from a lookback window behind their
+        high-water mark (see INCREMENTAL_TABLES). Then fact_orders is rebuilt
+        for the orders that changed and, in each summary table, only the
+        groups those orders fall in are recomputed. The result is validated
+        and published like a full build.
+
+        Falls back to build_database() when the database or a watermark is
+        missing, a source changed in any other way (including orders rows
+        older than the lookback window), or the declared indexes or summary
+        tables changed. Returns the build_database() summary plus
+        'mode' ('incremental' or 'full'), the 'reason' for a fallback, 'rows'
+        appended or upserted per table and the number of 'changed_orders'.
+        """
+        report = on_progress or (lambda fraction, message: None)
+        if not os.path.exists(self.db_name):
+            return self._full_refresh(on_progress, "no database yet")
+        live_conn = sqlite3.connect(f"file:{os.path.abspath(self.db_name)}?mode=ro", uri=True)
+        try:
+            manifest = self.read_manifest(live_conn)
+            watermarks = self.read_watermarks(live_conn)
+            structure_changed = self._missing_indexes(live_conn) or self._stale_views(manifest)
+        finally:
+            live_conn.close()
+        if structure_changed:
+            return self._full_refresh(on_progress, "indexes or summary tables changed")
+
+        report(0, f"📋 Checking {len(self.file_urls)} datasets...")
+        plan, reason = self._plan_refresh(manifest, watermarks)
+        if plan is None:
+            return self._full_refresh(on_progress, reason)
+
+        summary = {
+            'mode': 'incremental', 'reason': None, 'loaded': [], 'reused': [], 'failed': {},
+            'offline': [], 'views': [], 'rows': {}, 'changed_orders': 0
+        }
+        for table_name, (action, cached_file) in plan.items():
+            if cached_file.status == 'offline':
+                summary['offline'].append(table_name)
+            if action == 'reused':
+                summary['reused'].append(table_name)
+        changed_tables = [table_name for table_name, (action, _) in plan.items() if action != 'reused']
+        if not changed_tables:
+            return summary
+
+        fallback = None
+        build_conn, build_path = self._open_build()
+        try:
+            build_conn.execute("CREATE TEMP TABLE changed_orders (order_id TEXT PRIMARY KEY)")
+            build_conn.execute("CREATE TEMP TABLE refresh_keys (key PRIMARY KEY)")
+            build_conn.execute("BEGIN")
+            for done, table_name in enumerate(changed_tables):
+                action, cached_file = plan[table_name]
+                report(done / len(changed_tables), f"📋 Reading new rows of {table_name}...")
+                watermark = watermarks[table_name]
+                if action == 'append':
+                    rows = self._append_rows(build_conn, table_name, cached_file, watermark['byte_offset'])
+                else:
+                    rows, fallback = self._upsert_rows(build_conn, table_name, cached_file, watermark)
+                    if fallback is not None:
+                        break
+                row_count = build_conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+                self._write_manifest_row(build_conn, table_name, cached_file.sha256, row_count)
+                self._write_watermark(
+                    build_conn, table_name, cached_file, verified=watermark if action == 'upsert' else None
+                )
+                summary['loaded'].append(table_name)
+                summary['rows'][table_name] = rows
+            if fallback is None:
+                summary['changed_orders'] = build_conn.execute(
+                    "SELECT COUNT(*) FROM temp.changed_orders"
+                ).fetchone()[0]
+
+                report(1, "🧮 Updating summary tables...")
+                summary['views'] = self._refresh_views_incrementally(build_conn, changed_tables)
+                build_conn.execute("COMMIT")
+                build_conn.execute("PRAGMA optimize")
+                report(1, "🔎 Validating new database...")
+                self._validate_build(build_conn)
+                self._publish_build(build_conn, build_path)
+                build_conn = build_path = None
+        finally:
+            if build_conn is not None:
+                build_conn.close()
+            if build_path is not None and os.path.exists(build_path):
+                os.remove(build_path)
+
+        if fallback is not None:
+            return self._full_refresh(on_progress, fallback)
+        return summary
+
+    def _full_refresh(self, on_progress, reason):
+        summary = self.build_database(on_progress)
+        summary.update(mode='full', reason=reason, rows={}, changed_orders=None)
+        return summary
+
+    def _plan_refresh(self, manifest, watermarks):
+        """How refresh_database() can bring each table up to date.
+
+        Returns ({table_name: (action, cached_file)}, None) with action
+        'reused', 'append' or 'upsert', or (None, reason) when a full load
+        is needed.
+        """
+        names = list(self.file_urls)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='csv-loader') as executor:
+                cached_files = dict(zip(names, executor.map(self.download_cache.fetch, self.file_urls.values())))
+        except Exception as e:
+            return None, f"could not fetch the sources: {str(e)}"
+
+        plan = {}
+        for table_name, cached_file in cached_files.items():
+            if self._is_up_to_date(manifest.get(table_name), cached_file):
+                plan[table_name] = ('reused', cached_file)
+                continue
+            spec = INCREMENTAL_TABLES.get(table_name)
+            watermark = watermarks.get(table_name)
+            if spec is None or watermark is None or table_name not in manifest:
+                return None, f"{table_name} has no watermark"
+            if spec['mode'] == 'append' and (
+                cached_file.size < watermark['byte_offset']
+                or self._prefix_sha256(cached_file.path, watermark['byte_offset']) != watermark['prefix_sha256']
+            ):
+                return None, f"{table_name} changed before its last loaded row"
+            plan[table_name] = (spec['mode'], cached_file)
+        return plan, None
+
+    @staticmethod
+    def _prefix_sha256(path, length):
+        """SHA-256 of the first length bytes of a file"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            remaining = length
+            while remaining > 0:
+                block = f.read(min(1024 * 1024, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest()
+
+    def _append_rows(self, build_conn, table_name, cached_file, offset):
+        """Insert the rows written to a source file after byte offset; returns how many"""
+        if cached_file.size <= offset:
+            return 0
+        rows = 0
+        with open(cached_file.path, 'rb') as f:
+            columns = list(pd.read_csv(f, nrows=0).columns)
+            f.seek(offset)
+            try:
+                reader = pd.read_csv(
+                    f, header=None, names=columns, chunksize=LOAD_CHUNK_ROWS,
+                    **get_csv_read_options(table_name)
+                )
+                for chunk in reader:
+                    chunk = self._derive_columns(table_name, chunk)
+                    build_conn.executemany(self._insert_sql(table_name, chunk.columns), self._chunk_rows(chunk))
+                    self._mark_changed_orders(build_conn, table_name, chunk)
+                    rows += len(chunk)
+            except pd.errors.EmptyDataError:
+                pass  # only a trailing newline was added
+        return rows
+
+    def _upsert_rows(self, build_conn, table_name, cached_file, watermark):
+        """Bring an upserted table in line with its source file.
+
+        Rows before the recorded settled_before are only counted and hashed;
+        if they differ from the last load (edited, deleted or moved out of
+        the lookback window) nothing is written and (None, reason) is
+        returned so the caller reloads in full. Rows inside the window are
+        staged and compared with the table: new or changed ones are
+        replaced and ones gone from the file deleted. Returns (number of
+        rows written or deleted, None). Upserted tables are keyed by order_id.
+        """
+        column = INCREMENTAL_TABLES[table_name]['watermark']
+        cutoff = watermark['settled_before']
+        if cutoff is None or watermark['settled_sha256'] is None:
+            return None, f"{table_name} has no settled-rows watermark"
+        columns = [row[1] for row in build_conn.execute(f'PRAGMA table_info("{table_name}")')]
+        staging = self._staging_name(table_name)
+        build_conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        build_conn.execute(TABLE_DDL[table_name].format(table=staging))
+        insert_sql = self._insert_sql(staging, columns)
+
+        cutoff_timestamp = pd.Timestamp(cutoff, unit='s')
+        settled_rows = settled_total = 0
+        with open(cached_file.path, 'rb') as f:
+            reader = pd.read_csv(f, chunksize=LOAD_CHUNK_ROWS, **get_csv_read_options(table_name))
+            for chunk in reader:
+                chunk = self._derive_columns(table_name, chunk)[columns]
+                recent = (chunk[column] >= cutoff_timestamp).to_numpy()
+                if recent.any():
+                    build_conn.executemany(insert_sql, self._chunk_rows(chunk[recent]))
+                for row in self._chunk_rows(chunk[~recent]):
+                    settled_rows += 1
+                    settled_total += self._row_hash(row)
+        # A key repeated in the file also fails this check (the table keeps
+        # one row), which only costs a full reload
+        if self._digest(settled_rows, settled_total) != (watermark['settled_rows'], watermark['settled_sha256']):
+            build_conn.execute(f'DROP TABLE "{staging}"')
+            return None, f"{table_name} changed before its lookback window"
+
+        changed = build_conn.execute(f'''
+            SELECT order_id FROM (
+                SELECT * FROM "{staging}"
+                EXCEPT
+                SELECT * FROM "{table_name}" WHERE "{column}" >= ?
+            )
+        ''', (cutoff,)).fetchall()
+        removed = build_conn.execute(f'''
+            SELECT order_id FROM "{table_name}"
+            WHERE "{column}" >= ? AND order_id NOT IN (SELECT order_id FROM "{staging}")
+        ''', (cutoff,)).fetchall()
+        build_conn.executemany(f'INSERT OR REPLACE INTO "{table_name}" SELECT * FROM "{staging}" WHERE order_id = ?', changed)
+        build_conn.executemany(f'DELETE FROM "{table_name}" WHERE order_id = ?', removed)
+        build_conn.executemany("INSERT OR IGNORE INTO temp.changed_orders VALUES (?)", changed + removed)
+        window_rows = build_conn.execute(f'SELECT COUNT(*) FROM "{staging}"').fetchone()[0]
+        build_conn.execute(f'DROP TABLE "{staging}"')
+
+        # Settled rows match the file by hash and the window was just synced
+        table_rows = build_conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+        if table_rows != settled_rows + window_rows:
+            return None, f"{table_name} has {table_rows} rows after the refresh, the file {settled_rows + window_rows}"
+        return len(changed) + len(removed), None
+
+    @staticmethod
+    def _mark_changed_orders(build_conn, table_name, chunk):
+        """Add the orders a chunk of new rows belongs to to temp.changed_orders"""
+        if 'order_id' in chunk.columns:
+            build_conn.executemany(
+                "INSERT OR IGNORE INTO temp.changed_orders VALUES (?)",
+                ((order_id,) for order_id in chunk['order_id'].unique())
+            )
+        elif table_name == 'customers':
+            build_conn.executemany(
+                "INSERT OR IGNORE INTO temp.changed_orders SELECT order_id FROM orders WHERE customer_id = ?",
+                ((customer_id,) for customer_id in chunk['customer_id'].unique())
+            )
+
+    def _refresh_views_incrementally(self, build_conn, changed_tables):
+        """Recompute the summary table groups touched by temp.changed_orders.
+
+        Group keys are collected before fact_orders changes (the groups the
+        orders leave) and after (the groups they join). A summary table that
+        reads a changed source outside ORDER_KEYED_TABLES is recomputed in
+        full. Every summary table's manifest row is brought up to date;
+        returns the ones whose rows were recomputed.
+        """
+        changed = set(changed_tables)
+        old_keys = {
+            view_name: self._group_keys(build_conn, view)
+            for view_name, view in MATERIALIZED_VIEWS.items() if 'refresh' in view
+        }
+        manifest = self.read_manifest(build_conn)
+        refreshed = []
+        for view_name, view in MATERIALIZED_VIEWS.items():
+            changed_sources = changed.intersection(view['sources'])
+            if changed_sources:
+                if 'refresh' not in view or changed_sources - set(ORDER_KEYED_TABLES) - set(MATERIALIZED_VIEWS):
+                    self._recompute_groups(build_conn, view_name, view, None)
+                else:
+                    keys = old_keys[view_name] | self._group_keys(build_conn, view)
+                    if keys:
+                        self._recompute_groups(build_conn, view_name, view, keys)
+                changed.add(view_name)
+                refreshed.append(view_name)
+            signature = self._view_signature(view_name, manifest)
+            row_count = build_conn.execute(f'SELECT COUNT(*) FROM "{view_name}"').fetchone()[0]
+            self._write_manifest_row(build_conn, view_name, signature, row_count)
+            manifest[view_name] = {
+                'source_sha256': signature,
+                'schema_version': SCHEMA_VERSION,
+                'built_at': time.time(),
+                'row_count': row_count
+            }
+        return refreshed
+
+    @staticmethod
+    def _group_keys(build_conn, view):
+        return {row[0] for row in build_conn.execute(view['refresh']['keys'])}
+
+    @staticmethod
+    def _key_scope(expression, include_null):
+        scope = f"{expression} IN (SELECT key FROM temp.refresh_keys)"
+        return f"({scope} OR {expression} IS NULL)" if include_null else scope
+
+    def _recompute_groups(self, build_conn, view_name, view, keys):
+        """Replace a summary table's rows for the given group keys (all rows when keys is None)"""
+        if keys is None:
+            build_conn.execute(f'DELETE FROM "{view_name}"')
+            scope = '1'
+        else:
+            build_conn.execute("DELETE FROM temp.refresh_keys")
+            build_conn.executemany(
+                "INSERT INTO temp.refresh_keys VALUES (?)", ((key,) for key in keys if key is not None)
+            )
+            refresh = view['refresh']
+            build_conn.execute(
+                f'DELETE FROM "{view_name}" WHERE {self._key_scope(refresh["column"], None in keys)}'
+            )
+            scope = self._key_scope(refresh['key'], None in keys)
+        build_conn.execute(f'INSERT INTO "{view_name}" {view["sql"].format(scope=scope)}')
 
     @st.cache_resource
     def load_database(_self):
         """Load all data to SQLite - CORREGIDO con mejor manejo de errores"""
-        conn = sqlite3.connect(_self.db_name)
-        
         st.info("📥 Loading datasets...")
         progress_bar = st.progress(0)
         status_text = st.empty()
-        
-        total_files = len(_self.file_urls)
-        loaded_tables = []
-        failed_tables = []
-        
-        for i, (table_name, url) in enumerate(_self.file_urls.items()):
-            try:
-                status_text.text(f"📋 Loading {table_name}...")
-                
-                # Download and load CSV
-                df = pd.read_csv(url)
-                df.to_sql(table_name, conn, if_exists='replace', index=False)
-                loaded_tables.append(table_name)
-                
-                progress_bar.progress((i + 1) / total_files)
-                
-            except Exception as e:
-                st.error(f"❌ Error loading {table_name}: {str(e)}")
-                failed_tables.append(table_name)
-                continue
-        
-        conn.close()
-        
+
+        def on_progress(fraction, message):
+            progress_bar.progress(fraction)
+            status_text.text(message)
+
+        try:
+            if LOAD_INCREMENTAL:
+                summary = _self.refresh_database(on_progress)
+            else:
+                summary = _self.build_database(on_progress)
+        except Exception as e:
+            st.error(f"❌ Database rebuild failed, keeping the previous data: {str(e)}")
+            return
+
+        for table_name in summary['offline']:
+            st.warning(f"⚠️ {table_name}: source unreachable, using cached copy")
+        for table_name, error in summary['failed'].items():
+            st.error(f"❌ Error loading {table_name}: {error}")
+
         # Mostrar resumen de carga
-        if loaded_tables:
-            st.success(f"✅ Successfully loaded {len(loaded_tables)} tables")
-        if failed_tables:
-            st.warning(f"⚠️ Failed to load {len(failed_tables)} tables: {', '.join(failed_tables)}")
+        if summary['loaded']:
+            st.success(f"✅ Successfully loaded {len(summary['loaded'])} tables")
+        if summary['reused']:
+            st.success(f"✅ {len(summary['reused'])} tables already up to date")
+        if summary.get('rows'):
+            st.success(f"✅ Added {sum(summary['rows'].values()):,} new rows")
+        if summary['views']:
+            st.success(f"✅ Refreshed {len(summary['views'])} summary tables")
+        if summary['failed']:
+            st.warning(f"⚠️ Failed to load {len(summary['failed'])} tables: {', '.join(summary['failed'])}")
         
         status_text.text("✅ Database loading completed!")
 
+        if WARMUP_ON_START:
+            try:
+                _self.warm_up()
+            except sqlite3.Error as e:
+                st.warning(f"⚠️ Cache warm-up skipped: {str(e)}")
+
     def get_db_path(self):
         return self.db_name
 
     def create_connection(self):
         """Create a new connection for the current thread"""
-        return sqlite3.connect(self.db_name)
+        conn = sqlite3.connect(self.db_name)
+        self._apply_read_pragmas(conn)
+        return conn
+
+    def _apply_read_pragmas(self, conn):
+        for pragma, value in self.read_pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+
+    def _snapshot_id(self):
+        """Identify the file currently at db_name; changes when a rebuild is swapped in"""
+        stat = os.stat(self.db_name)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _open_reader(self, snapshot, pooled):
+        uri = f"file:{os.path.abspath(self.db_name)}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        # Pooled connections move between Streamlit script threads, one at a time
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._apply_read_pragmas(conn)
+        with self._pool_lock:
+            self._pool_stats['opened'] += 1
+        return {'conn': conn, 'snapshot': snapshot, 'pooled': pooled}
+
+    @staticmethod
+    def _is_usable(entry, snapshot):
+        """Health check: same snapshot as the live file and still answering"""
+        if entry['snapshot'] != snapshot:
+            return False
+        try:
+            entry['conn'].execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, entry):
+        entry['conn'].close()
+        if entry['pooled']:
+            with self._pool_lock:
+                self._pooled_count -= 1
+
+    def _reclaim_dead_threads(self):
+        """Return connections held by finished threads to the idle list (lock held)"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        for thread_id in [tid for tid in self._checked_out if tid not in alive]:
+            entry = self._checked_out.pop(thread_id)
+            if entry['pooled']:
+                self._idle.append(entry)
+            else:
+                entry['conn'].close()
+
+    def get_connection(self):
+        """Return a pooled read-only connection for the current thread.
+
+        The same thread gets the same connection until it releases it.
+        Otherwise an idle connection is reused, keeping its warm page cache,
+        or a new one is opened with READ_PRAGMAS applied. Connections whose
+        file was replaced by a rebuild or that fail a health check are
+        reopened, so readers move to a new snapshot on their next rerun.
+        """
+        thread_id = threading.get_ident()
+        snapshot = self._snapshot_id()
+        with self._pool_lock:
+            entry = self._checked_out.pop(thread_id, None)
+            if entry is None:
+                self._reclaim_dead_threads()
+                entry = self._idle.pop() if self._idle else None
+
+        if entry is not None and not self._is_usable(entry, snapshot):
+            self._discard(entry)
+            entry = None
+            with self._pool_lock:
+                self._pool_stats['reopened'] += 1
+        elif entry is not None:
+            with self._pool_lock:
+                self._pool_stats['reused'] += 1
+
+        if entry is None:
+            with self._pool_lock:
+                pooled = self._pooled_count < self.pool_size
+                if pooled:
+                    self._pooled_count += 1
+            try:
+                entry = self._open_reader(snapshot, pooled)
+            except Exception:
+                if pooled:
+                    with self._pool_lock:
+                        self._pooled_count -= 1
+                raise
+
+        with self._pool_lock:
+            self._checked_out[thread_id] = entry
+        return entry['conn']
+
+    def release_connection(self, conn=None):
+        """Hand the current thread's connection back to the pool"""
+        with self._pool_lock:
+            entry = self._checked_out.pop(threading.get_ident(), None)
+            if entry is not None and entry['pooled']:
+                self._idle.append(entry)
+                return
+        if entry is not None:
+            entry['conn'].close()
+
+    def close_all_connections(self):
+        """Close every pooled connection (idle and checked out)"""
+        with self._pool_lock:
+            entries = self._idle + list(self._checked_out.values())
+            self._idle = []
+            self._checked_out = {}
+            self._pooled_count = 0
+        self._pool_stats = {'opened': 0, 'reused': 0, 'reopened': 0}
+        for entry in entries:
+            entry['conn'].close()
+
+    @staticmethod
+    def _index_scans(conn, table_name):
+        """Covering scans that read every page of each index on table_name"""
+        scans = []
+        for _, index_name, *_ in conn.execute(f"PRAGMA index_list({table_name})").fetchall():
+            columns = [row[2] for row in conn.execute(f"PRAGMA index_info({index_name})") if row[2]]
+            if columns:
+                column_list = ', '.join(columns)
+                scans.append(
+                    f"SELECT {column_list} FROM {table_name} INDEXED BY {index_name} ORDER BY {column_list}"
+                )
+        return scans
+
+    def warm_up(self, tables=WARMUP_TABLES):
+        """Read hot tables and their indexes once to prime the OS and page caches.
+
+        Runs on a pooled connection, so the pages stay in that connection's
+        cache as well as in the OS page cache (or the mmap'd region).
+        """
+        tables = list(MATERIALIZED_VIEWS) if tables is None else list(tables)
+        start = time.perf_counter()
+        rows = 0
+        touched = []
+        conn = self.get_connection()
+        try:
+            existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table_name in tables:
+                if table_name not in existing:
+                    continue
+                for query in [f"SELECT * FROM {table_name}"] + self._index_scans(conn, table_name):
+                    cursor = conn.execute(query)
+                    while True:
+                        batch = cursor.fetchmany(10_000)
+                        if not batch:
+                            break
+                        rows += len(batch)
+                touched.append(table_name)
+        finally:
+            self.release_connection(conn)
+
+        self.last_warmup = {
+            'tables': touched,
+            'rows_read': rows,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        return self.last_warmup
+
+    def connection_report(self):
+        """Effective read settings, pool reuse counters and query cache statistics.
+
+        SQLite's own page-cache hit counters are not reachable from Python's
+        sqlite3 module, so pool reuse and the result cache are reported instead.
+        """
+        conn = self.get_connection()
+        try:
+            settings = {
+                pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                for pragma in ('mmap_size', 'cache_size', 'temp_store', 'page_size', 'page_count')
+            }
+        finally:
+            self.release_connection(conn)
+        settings['database_bytes'] = settings['page_size'] * settings['page_count']
+
+        with self._pool_lock:
+            pool = dict(self._pool_stats)
+            pool.update(
+                size=self.pool_size,
+                open=self._pooled_count,
+                idle=len(self._idle),
+                checked_out=len(self._checked_out)
+            )
+        return {
+            'settings': settings,
+            'pool': pool,
+            'query_cache': query_cache.stats(),
+            'figure_cache': figure_cache.stats(),
+            'prefetch': prefetcher.stats(),
+            'warmup': self.last_warmup
+        }
 
 # Global instance of the data loader
 data_loader = DataLoader()
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Shared pytest setup: the app imports its packages relative to ecommerce/
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def dataset_dir(tmp_path_factory):
+    """A small synthetic Olist dataset (~2k orders)"""
+    from tools.generate_dataset import generate_dataset
+
+    path = tmp_path_factory.mktemp('dataset')
+    generate_dataset(str(path), scale=0.02, seed=0)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def database(dataset_dir, tmp_path_factory):
+    """Path of a database built from dataset_dir"""
+    from data_loader import DataLoader
+    from utils.download_cache import DownloadCache
+
+    db_path = str(tmp_path_factory.mktemp('db') / 'ecommerce.db')
+    loader = DataLoader(db_name=db_path, source_dir=dataset_dir)
+    loader.download_cache = DownloadCache(cache_dir=str(tmp_path_factory.mktemp('downloads')))
+    summary = loader.build_database()
+    assert not summary['failed'], summary['failed']
+    return db_path
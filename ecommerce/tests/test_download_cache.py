@@ -0,0 +1,164 @@
+"""
+DownloadCache against a local HTTP stand-in for the Google Drive exports
+"""
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.download_cache import DownloadCache
+
+
+class StandInServer:
+    """Serves files from a dict with ETags and conditional GETs.
+
+    ``truncate`` makes the next response promise more bytes than it sends,
+    like a connection dropped mid-download.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self.truncate = False
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get('If-None-Match')))
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if server.truncate:
+                    server.truncate = False
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                else:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def statuses(self):
+        return [etag is not None for _, etag in self.requests]
+
+
+@pytest.fixture
+def server():
+    stand_in = StandInServer()
+    stand_in.thread.start()
+    yield stand_in
+    stand_in.httpd.shutdown()
+    stand_in.httpd.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # ttl=0 revalidates on every fetch
+    return DownloadCache(cache_dir=str(tmp_path / 'downloads'), ttl=0, timeout=5)
+
+
+def read(cached_file):
+    with open(cached_file.path, 'rb') as f:
+        return f.read()
+
+
+def test_first_fetch_downloads_and_stores(server, cache):
+    server.files['/orders.csv'] = b'order_id,order_status\n1,delivered\n'
+    cached = cache.fetch(server.url('/orders.csv'))
+
+    assert cached.status == 'downloaded'
+    assert read(cached) == server.files['/orders.csv']
+    assert cached.sha256 == hashlib.sha256(server.files['/orders.csv']).hexdigest()
+    assert cached.size == len(server.files['/orders.csv'])
+    assert cached.etag is not None
+
+
+def test_unchanged_file_is_revalidated_with_304(server, cache):
+    server.files['/orders.csv'] = b'order_id,order_status\n1,delivered\n'
+    first = cache.fetch(server.url('/orders.csv'))
+    second = cache.fetch(server.url('/orders.csv'))
+
+    assert second.status == 'revalidated'
+    assert second.path == first.path
+    assert second.sha256 == first.sha256
+    # The second request was conditional
+    assert server.statuses() == [False, True]
+
+
+def test_fresh_entry_skips_the_network(server, tmp_path):
+    cache = DownloadCache(cache_dir=str(tmp_path / 'downloads'), ttl=3600, timeout=5)
+    server.files['/orders.csv'] = b'order_id\n1\n'
+    cache.fetch(server.url('/orders.csv'))
+
+    assert cache.fetch(server.url('/orders.csv')).status == 'fresh'
+    assert len(server.requests) == 1
+
+
+def test_changed_file_is_downloaded_again(server, cache):
+    server.files['/orders.csv'] = b'order_id,order_status\n1,shipped\n'
+    first = cache.fetch(server.url('/orders.csv'))
+    server.files['/orders.csv'] = b'order_id,order_status\n1,delivered\n'
+    second = cache.fetch(server.url('/orders.csv'))
+
+    assert second.status == 'downloaded'
+    assert second.sha256 != first.sha256
+    assert read(second) == server.files['/orders.csv']
+    # The superseded object is released
+    assert not os.path.exists(first.path)
+
+
+def test_truncated_object_is_downloaded_again(server, cache):
+    server.files['/orders.csv'] = b'order_id,order_status\n1,delivered\n'
+    first = cache.fetch(server.url('/orders.csv'))
+    with open(first.path, 'r+b') as f:
+        f.truncate(5)
+
+    second = cache.fetch(server.url('/orders.csv'))
+
+    assert second.status == 'downloaded'
+    assert read(second) == server.files['/orders.csv']
+    # The damaged entry was discarded, so the request was unconditional
+    assert server.statuses() == [False, False]
+
+
+def test_interrupted_download_keeps_the_last_good_copy(server, cache):
+    server.files['/orders.csv'] = b'order_id,order_status\n1,shipped\n'
+    first = cache.fetch(server.url('/orders.csv'))
+    server.files['/orders.csv'] = b'order_id,order_status\n1,delivered\n' * 100
+    server.truncate = True
+
+    second = cache.fetch(server.url('/orders.csv'))
+
+    assert second.status == 'offline'
+    assert second.sha256 == first.sha256
+    assert read(second) == b'order_id,order_status\n1,shipped\n'
+    assert not [name for name in os.listdir(cache.objects_dir) if name.endswith('.part')]
+
+
+def test_interrupted_first_download_raises(server, cache):
+    server.files['/orders.csv'] = b'order_id\n1\n' * 100
+    server.truncate = True
+
+    with pytest.raises(Exception):
+        cache.fetch(server.url('/orders.csv'))
+    assert os.listdir(cache.objects_dir) == []
+    assert os.listdir(cache.entries_dir) == []
@@ -0,0 +1,136 @@
+"""
+refresh_database against a full rebuild of the same export, table by table
+"""
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from config.db_schema import INCREMENTAL_TABLES
+from data_loader import MANIFEST_TABLE, WATERMARKS_TABLE, DataLoader
+from utils.download_cache import DownloadCache
+
+# Orders the base export does not have yet, by days before the newest purchase
+HELD_DAYS = 5
+LOOKBACK_DAYS = INCREMENTAL_TABLES['orders']['lookback_days']
+# Tables that record how a database was built rather than its data
+BOOKKEEPING_TABLES = (MANIFEST_TABLE, WATERMARKS_TABLE)
+
+
+def _read_csv(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def _purchases(orders):
+    return pd.to_datetime(orders['order_purchase_timestamp'])
+
+
+@pytest.fixture
+def exports(dataset_dir, tmp_path):
+    """Directories 'base' (without the newest orders) and 'new' (base plus those
+    orders and their rows appended, as the next export would have them)"""
+    base, new = tmp_path / 'base', tmp_path / 'new'
+    shutil.copytree(dataset_dir, base)
+    shutil.copytree(dataset_dir, new)
+    orders = _read_csv(base / 'orders.csv')
+    purchased = _purchases(orders)
+    held = purchased >= purchased.max() - pd.Timedelta(days=HELD_DAYS)
+    assert held.any() and not held.all()
+    held_orders = set(orders['order_id'][held])
+    for name, key, held_keys in [
+        ('orders.csv', 'order_id', held_orders),
+        ('customers.csv', 'customer_id', set(orders['customer_id'][held])),
+        ('order_items.csv', 'order_id', held_orders),
+        ('order_payments.csv', 'order_id', held_orders),
+        ('order_reviews.csv', 'order_id', held_orders),
+    ]:
+        df = _read_csv(base / name)
+        is_held = df[key].isin(held_keys)
+        df[~is_held].to_csv(base / name, index=False)
+        pd.concat([df[~is_held], df[is_held]]).to_csv(new / name, index=False)
+    return base, new
+
+
+def _loader(db_path, source_dir, cache_dir):
+    loader = DataLoader(db_name=str(db_path), source_dir=str(source_dir))
+    loader.download_cache = DownloadCache(cache_dir=str(cache_dir))
+    return loader
+
+
+def _refresh(exports, tmp_path, new_dir):
+    """Build from the base export, refresh it from new_dir; returns (summary, db, full rebuild)"""
+    base, _ = exports
+    db_path, full_path = tmp_path / 'refreshed.db', tmp_path / 'full.db'
+    summary = _loader(db_path, base, tmp_path / 'cache').build_database()
+    assert not summary['failed'], summary['failed']
+    summary = _loader(db_path, new_dir, tmp_path / 'cache').refresh_database()
+    assert not summary['failed'], summary['failed']
+    full = _loader(full_path, new_dir, tmp_path / 'cache-full').build_database()
+    assert not full['failed'], full['failed']
+    return summary, db_path, full_path
+
+
+def _table(conn, name):
+    df = pd.read_sql_query(f'SELECT * FROM "{name}"', conn)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def _assert_same_tables(db_path, full_path):
+    with sqlite3.connect(db_path) as conn, sqlite3.connect(full_path) as full:
+        tables = lambda c: {
+            name for (name,) in c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            if not name.startswith('sqlite_') and name not in BOOKKEEPING_TABLES
+        }
+        assert tables(conn) == tables(full)
+        for name in sorted(tables(full)):
+            pd.testing.assert_frame_equal(
+                _table(conn, name), _table(full, name),
+                check_dtype=False, check_exact=False, rtol=1e-9, obj=name
+            )
+        assert conn.execute('PRAGMA integrity_check').fetchone() == ('ok',)
+
+
+def _edit_order(exports, tmp_path, pick):
+    """'new' export whose orders.csv cancels the order pick(orders, purchased) selects"""
+    base, _ = exports
+    edited = tmp_path / 'edited'
+    shutil.copytree(base, edited)
+    orders = _read_csv(edited / 'orders.csv')
+    index = pick(orders, _purchases(orders))
+    assert orders.at[index, 'order_status'] != 'canceled'
+    orders.loc[index, 'order_status'] = 'canceled'
+    orders.to_csv(edited / 'orders.csv', index=False)
+    return edited
+
+
+def test_appended_orders_match_full_rebuild(exports, tmp_path):
+    _, new = exports
+    summary, db_path, full_path = _refresh(exports, tmp_path, new)
+    assert summary['mode'] == 'incremental', summary['reason']
+    assert summary['rows']['orders'] > 0
+    _assert_same_tables(db_path, full_path)
+
+
+def test_status_change_inside_lookback_window_is_upserted(exports, tmp_path):
+    def recent(orders, purchased):
+        window = purchased >= purchased.max() - pd.Timedelta(days=LOOKBACK_DAYS // 2)
+        return orders.index[window & (orders['order_status'] == 'delivered')][0]
+
+    edited = _edit_order(exports, tmp_path, recent)
+    summary, db_path, full_path = _refresh(exports, tmp_path, edited)
+    assert summary['mode'] == 'incremental', summary['reason']
+    assert summary['changed_orders'] >= 1
+    _assert_same_tables(db_path, full_path)
+
+
+def test_edit_before_lookback_window_falls_back_to_full_load(exports, tmp_path):
+    def old(orders, purchased):
+        before = purchased < purchased.max() - pd.Timedelta(days=LOOKBACK_DAYS * 3)
+        return orders.index[before & (orders['order_status'] == 'delivered')][0]
+
+    edited = _edit_order(exports, tmp_path, old)
+    summary, db_path, full_path = _refresh(exports, tmp_path, edited)
+    assert summary['mode'] == 'full'
+    assert summary['reason']
+    _assert_same_tables(db_path, full_path)
@@ -0,0 +1,74 @@
+"""
+find_issues on fixed EXPLAIN QUERY PLAN rows (SQLite 3.36+ prints aliases)
+"""
+from utils.query_plan import find_issues, table_aliases
+
+TABLES = {'fact_orders', 'customers', 'mv_overview'}
+
+
+def _issues(details, query):
+    plan = [(i + 2, 0, detail) for i, detail in enumerate(details)]
+    return [(issue['kind'], issue['expected']) for issue in find_issues(plan, TABLES, query)]
+
+
+def test_aliases_resolve_to_tables():
+    query = """
+        SELECT * FROM fact_orders f
+        JOIN customers AS c ON c.customer_id = f.customer_id
+        LEFT JOIN mv_overview WHERE 1
+    """
+    aliases = table_aliases(query, TABLES)
+    assert aliases['f'] == 'fact_orders'
+    assert aliases['c'] == 'customers'
+    assert 'WHERE' not in aliases and 'where' not in aliases
+
+
+def test_aliased_full_scan_is_flagged():
+    assert _issues(['SCAN f'], 'SELECT * FROM fact_orders f') == [('full scan', False)]
+
+
+def test_full_index_scan_is_flagged():
+    issues = _issues(
+        ['SCAN f USING COVERING INDEX idx_fact_orders_status_month'],
+        'SELECT COUNT(*) FROM fact_orders AS f'
+    )
+    assert issues == [('full index scan (idx_fact_orders_status_month)', False)]
+
+
+def test_index_search_is_fine():
+    issues = _issues(
+        ['SEARCH f USING INDEX idx_fact_orders_status_month (order_status=?)'],
+        'SELECT * FROM fact_orders f WHERE f.order_status = ?'
+    )
+    assert issues == []
+
+
+def test_summary_table_scan_and_sort_are_expected():
+    issues = _issues(
+        ['SCAN mv_overview', 'USE TEMP B-TREE FOR ORDER BY'],
+        'SELECT * FROM mv_overview ORDER BY 1'
+    )
+    assert issues == [('full scan', True), ('temp b-tree (order by)', True)]
+
+
+def test_cte_and_subquery_scans_are_not_flagged():
+    query = """
+        WITH selected AS (SELECT * FROM fact_orders f WHERE f.order_status = ?)
+        SELECT * FROM selected s, (SELECT 1) d
+    """
+    issues = _issues(
+        ['SEARCH f USING INDEX idx_fact_orders_status_month (order_status=?)', 'SCAN s', 'SCAN d'],
+        query
+    )
+    assert issues == []
+
+
+def test_sort_after_index_search_is_expected_but_not_after_full_scan():
+    query = 'SELECT customer_state, COUNT(*) FROM fact_orders f WHERE f.order_status = ? GROUP BY 1'
+    searched = _issues(
+        ['SEARCH f USING INDEX idx_fact_orders_status_month (order_status=?)', 'USE TEMP B-TREE FOR GROUP BY'],
+        query
+    )
+    assert searched == [('temp b-tree (group by)', True)]
+    scanned = _issues(['SCAN f', 'USE TEMP B-TREE FOR GROUP BY'], query)
+    assert scanned == [('full scan', False), ('temp b-tree (group by)', False)]
@@ -0,0 +1,64 @@
+"""
+Every get_* section query must be answered from an index or a small mv_ table,
+on the default path and with sidebar filters applied
+"""
+import re
+import sqlite3
+
+import pytest
+
+from config.db_schema import TABLE_INDEXES, get_index_name
+from tools.query_plan_report import collect_plans, iter_query_calls, iter_query_functions
+from utils.perf import perf
+
+# Tables the filtered section queries look rows up in; the other base-table
+# indexes serve the loader (e.g. orders.customer_id in an incremental refresh)
+SEARCHED_TABLES = ('fact_orders', 'order_reviews')
+_SEARCH_INDEX = re.compile(r'^SEARCH \w+ USING (?:COVERING )?INDEX (\w+)')
+
+
+@pytest.fixture(scope='module')
+def plans(database):
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    explain = perf.explain
+    try:
+        yield dict(collect_plans(conn))
+    finally:
+        perf.explain = explain
+        conn.close()
+
+
+def test_every_query_function_is_explained(plans):
+    functions = {f"{module}.{func.__name__}" for module, func in iter_query_functions()}
+    assert {section for section, _, _ in iter_query_calls()} == set(plans)
+    assert functions <= set(plans)
+    filtered = {section.split('[')[0] for section in plans if '[' in section}
+    assert len(filtered) == len(functions) - 1, "only get_filter_options runs unfiltered"
+    for section, events in plans.items():
+        assert events, f"{section} ran no SQL"
+
+
+@pytest.mark.parametrize('section', [section for section, _, _ in iter_query_calls()])
+def test_query_uses_indexes(plans, section):
+    flagged = [
+        issue['detail']
+        for event in plans[section]
+        for issue in event['plan_issues'] if not issue['expected']
+    ]
+    assert not flagged, f"{section}: {flagged}"
+
+
+def test_declared_indexes_are_searched(plans):
+    used = {
+        match.group(1)
+        for events in plans.values()
+        for event in events
+        for _, _, detail in event['plan']
+        for match in [_SEARCH_INDEX.match(detail)] if match
+    }
+    declared = {
+        get_index_name(table, columns)
+        for table in SEARCHED_TABLES
+        for columns in TABLE_INDEXES[table]
+    }
+    assert declared <= used, f"never searched: {sorted(declared - used)}"
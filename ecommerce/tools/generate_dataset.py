@@ -0,0 +1,400 @@
+"""
+Synthetic Olist-shaped dataset generator
+
+Writes the nine CSV files named in CSV_FILE_IDS with the Olist columns, key
+relationships and approximate public-dataset distributions (states, order
+statuses, payment types, review scores, categories, items per order and the
+2016-2018 order volume curve). Output is deterministic for a given seed and
+scale, and nothing is downloaded.
+
+Run from the ecommerce/ directory:
+    python -m tools.generate_dataset --scale 10 --seed 42 --out data/synthetic
+    OLIST_DATA_DIR=data/synthetic streamlit run app.py
+
+Scale 1 matches the public dataset (~99k orders). Orders, customers, items,
+payments, reviews, products and sellers grow linearly with the scale;
+geolocation is a zip-code lookup and keeps its 1x size above scale 1.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.gdrive_config import CSV_FILE_IDS, OLIST_DATE_FORMAT
+
+# Row counts of the public dataset (scale 1)
+BASE_ORDERS = 99_441
+BASE_PRODUCTS = 32_951
+BASE_SELLERS = 3_095
+BASE_GEOLOCATION = 1_000_163
+
+# Orders generated (and written) per block; fixed so output does not depend on memory
+BLOCK_ORDERS = 200_000
+
+# (code, share of customers, share of sellers, zip prefix range, capital, lat, lng)
+STATES = [
+    ('SP', 41.98, 59.74, (1000, 19999), 'sao paulo', -23.55, -46.63),
+    ('RJ', 12.92, 5.46, (20000, 28999), 'rio de janeiro', -22.91, -43.17),
+    ('MG', 11.70, 7.88, (30000, 39999), 'belo horizonte', -19.92, -43.94),
+    ('RS', 5.50, 4.20, (90000, 99999), 'porto alegre', -30.03, -51.23),
+    ('PR', 5.07, 11.28, (80000, 87999), 'curitiba', -25.43, -49.27),
+    ('SC', 3.66, 6.14, (88000, 89999), 'florianopolis', -27.59, -48.55),
+    ('BA', 3.40, 0.61, (40000, 48999), 'salvador', -12.97, -38.50),
+    ('DF', 2.15, 0.97, (70000, 72799), 'brasilia', -15.79, -47.88),
+    ('ES', 2.04, 0.74, (29000, 29999), 'vitoria', -20.32, -40.34),
+    ('GO', 2.03, 1.29, (72800, 76799), 'goiania', -16.68, -49.25),
+    ('PE', 1.66, 0.29, (50000, 56999), 'recife', -8.05, -34.88),
+    ('CE', 1.34, 0.42, (60000, 63999), 'fortaleza', -3.73, -38.52),
+    ('PA', 0.98, 0.03, (66000, 68899), 'belem', -1.46, -48.49),
+    ('MT', 0.91, 0.13, (78000, 78899), 'cuiaba', -15.60, -56.10),
+    ('MA', 0.75, 0.03, (65000, 65999), 'sao luis', -2.53, -44.30),
+    ('MS', 0.72, 0.16, (79000, 79999), 'campo grande', -20.47, -54.62),
+    ('PB', 0.54, 0.19, (58000, 58999), 'joao pessoa', -7.12, -34.86),
+    ('PI', 0.50, 0.03, (64000, 64999), 'teresina', -5.09, -42.80),
+    ('RN', 0.49, 0.16, (59000, 59999), 'natal', -5.79, -35.21),
+    ('AL', 0.42, 0.03, (57000, 57999), 'maceio', -9.67, -35.74),
+    ('SE', 0.34, 0.06, (49000, 49999), 'aracaju', -10.91, -37.07),
+    ('TO', 0.28, 0.03, (77000, 77999), 'palmas', -10.18, -48.33),
+    ('RO', 0.25, 0.06, (76800, 76999), 'porto velho', -8.76, -63.90),
+    ('AM', 0.15, 0.03, (69000, 69299), 'manaus', -3.12, -60.02),
+    ('AC', 0.08, 0.03, (69900, 69999), 'rio branco', -9.97, -67.81),
+    ('AP', 0.07, 0.01, (68900, 68999), 'macapa', 0.03, -51.07),
+    ('RR', 0.05, 0.01, (69300, 69399), 'boa vista', 2.82, -60.67),
+]
+
+ORDER_STATUSES = {
+    'delivered': 97.02, 'shipped': 1.11, 'canceled': 0.63, 'unavailable': 0.61,
+    'invoiced': 0.32, 'processing': 0.30, 'created': 0.01, 'approved': 0.01
+}
+
+# Orders per purchase month in the public dataset, which drives the volume curve
+MONTHLY_ORDERS = {
+    '2016-09': 4, '2016-10': 324, '2016-12': 1,
+    '2017-01': 800, '2017-02': 1780, '2017-03': 2682, '2017-04': 2404,
+    '2017-05': 3700, '2017-06': 3245, '2017-07': 4026, '2017-08': 4331,
+    '2017-09': 4285, '2017-10': 4631, '2017-11': 7544, '2017-12': 5673,
+    '2018-01': 7269, '2018-02': 6728, '2018-03': 7211, '2018-04': 6939,
+    '2018-05': 6873, '2018-06': 6167, '2018-07': 6292, '2018-08': 6512,
+    '2018-09': 16, '2018-10': 4
+}
+
+# (Portuguese name, English translation, share of products)
+CATEGORIES = [
+    ('cama_mesa_banho', 'bed_bath_table', 3029),
+    ('esporte_lazer', 'sports_leisure', 2867),
+    ('moveis_decoracao', 'furniture_decor', 2657),
+    ('beleza_saude', 'health_beauty', 2444),
+    ('utilidades_domesticas', 'housewares', 2335),
+    ('automotivo', 'auto', 1900),
+    ('informatica_acessorios', 'computers_accessories', 1639),
+    ('brinquedos', 'toys', 1411),
+    ('relogios_presentes', 'watches_gifts', 1329),
+    ('telefonia', 'telephony', 1134),
+    ('bebes', 'baby', 919),
+    ('perfumaria', 'perfumery', 868),
+    ('papelaria', 'stationery', 849),
+    ('fashion_bolsas_e_acessorios', 'fashion_bags_accessories', 849),
+    ('cool_stuff', 'cool_stuff', 789),
+    ('ferramentas_jardim', 'garden_tools', 753),
+    ('pet_shop', 'pet_shop', 719),
+    ('eletronicos', 'electronics', 517),
+    ('construcao_ferramentas_construcao', 'construction_tools_construction', 400),
+    ('eletrodomesticos', 'home_appliances', 370),
+    ('malas_acessorios', 'luggage_accessories', 349),
+    ('consoles_games', 'consoles_games', 317),
+    ('moveis_escritorio', 'office_furniture', 309),
+    ('instrumentos_musicais', 'musical_instruments', 289),
+    ('eletroportateis', 'small_appliances', 231),
+    ('casa_construcao', 'home_construction', 225),
+    ('livros_interesse_geral', 'books_general_interest', 216),
+    ('climatizacao', 'air_conditioning', 124),
+    ('alimentos', 'food', 82),
+    ('bebidas', 'drinks', 81),
+]
+
+# Share of products without a category, as in the public dataset
+UNCATEGORIZED_SHARE = 0.0185
+
+ITEMS_PER_ORDER = {1: 90.1, 2: 7.6, 3: 1.3, 4: 0.5, 5: 0.3, 6: 0.2}
+PAYMENT_TYPES = {'credit_card': 73.9, 'boleto': 19.0, 'voucher': 5.6, 'debit_card': 1.5}
+INSTALLMENTS = {1: 50.6, 2: 11.9, 3: 10.1, 4: 6.8, 5: 5.0, 6: 3.8, 7: 1.6, 8: 4.1, 9: 0.6, 10: 5.5}
+
+# Review score weights for on-time deliveries, late deliveries and undelivered orders
+REVIEW_SCORES_ON_TIME = [6.5, 2.5, 7.5, 20.5, 63.0]
+REVIEW_SCORES_LATE = [46.0, 9.0, 12.0, 12.0, 21.0]
+REVIEW_SCORES_UNDELIVERED = [70.0, 8.0, 10.0, 5.0, 7.0]
+REVIEW_TITLES = ['recomendo', 'otimo', 'muito bom', 'nao recebi', 'bom', 'excelente']
+REVIEW_MESSAGES = [
+    'produto chegou antes do prazo', 'recomendo o vendedor', 'muito bom, recomendo',
+    'ainda nao recebi o produto', 'produto diferente do anunciado', 'entrega rapida e produto otimo',
+    'veio com defeito', 'gostei muito'
+]
+
+_HEX = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+def _weights(values):
+    weights = np.asarray(values, dtype='float64')
+    return weights / weights.sum()
+
+
+def _hex_ids(rng, n):
+    """n random 32-character hex ids, like the Olist md5-style keys"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    chars = np.empty((n, 32), dtype=np.uint8)
+    chars[:, 0::2] = _HEX[raw >> 4]
+    chars[:, 1::2] = _HEX[raw & 15]
+    return chars.view('S32').ravel().astype(str)
+
+
+def _format_dates(values):
+    """datetime64[s] array -> Olist timestamp strings, '' for missing"""
+    return pd.Series(pd.to_datetime(values)).dt.strftime(OLIST_DATE_FORMAT).fillna('').to_numpy()
+
+
+def _state_columns(rng, n, share_index):
+    """State codes, zip prefixes and cities drawn from STATES"""
+    state_idx = rng.choice(len(STATES), size=n, p=_weights([s[share_index] for s in STATES]))
+    low = np.array([s[3][0] for s in STATES])[state_idx]
+    high = np.array([s[3][1] for s in STATES])[state_idx]
+    zips = low + (rng.random(n) * (high - low + 1)).astype('int64')
+    states = np.array([s[0] for s in STATES])[state_idx]
+    cities = np.array([s[4] for s in STATES])[state_idx]
+    return state_idx, states, zips, cities
+
+
+def _purchase_times(rng, n):
+    months = list(MONTHLY_ORDERS)
+    month_idx = rng.choice(len(months), size=n, p=_weights(list(MONTHLY_ORDERS.values())))
+    starts = np.array([np.datetime64(f"{month}-01T00:00:00") for month in months])
+    offsets = (rng.random(n) * 28 * 86400).astype('int64')
+    return starts[month_idx] + offsets.astype('timedelta64[s]')
+
+
+class _CsvWriter:
+    """Appends DataFrames to <out>/<table>.csv, writing the header once"""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.rows = {}
+
+    def write(self, table_name, df):
+        path = os.path.join(self.out_dir, f"{table_name}.csv")
+        first = table_name not in self.rows
+        df.to_csv(path, mode='w' if first else 'a', header=first, index=False)
+        self.rows[table_name] = self.rows.get(table_name, 0) + len(df)
+
+
+def generate_catalogue(rng, scale, writer):
+    """Products, sellers and category translations; returns arrays orders need"""
+    n_sellers = max(1, round(BASE_SELLERS * scale))
+    _, seller_states, seller_zips, seller_cities = _state_columns(rng, n_sellers, 2)
+    seller_ids = _hex_ids(rng, n_sellers)
+    writer.write('sellers', pd.DataFrame({
+        'seller_id': seller_ids,
+        'seller_zip_code_prefix': seller_zips,
+        'seller_city': seller_cities,
+        'seller_state': seller_states
+    }))
+
+    n_products = max(1, round(BASE_PRODUCTS * scale))
+    product_ids = _hex_ids(rng, n_products)
+    category_idx = rng.choice(len(CATEGORIES), size=n_products, p=_weights([c[2] for c in CATEGORIES]))
+    categories = np.array([c[0] for c in CATEGORIES], dtype=object)[category_idx]
+    categories[rng.random(n_products) < UNCATEGORIZED_SHARE] = None
+    # A product is sold by one seller; a few large sellers carry most products
+    product_seller = np.minimum((rng.pareto(1.2, n_products) * n_sellers / 20).astype('int64'), n_sellers - 1)
+    product_price = np.clip(rng.lognormal(np.log(75), 0.9, n_products), 0.85, 6735).round(2)
+    writer.write('products', pd.DataFrame({
+        'product_id': product_ids,
+        'product_category_name': categories,
+        'product_name_lenght': rng.integers(5, 77, n_products),
+        'product_description_lenght': rng.integers(4, 3993, n_products),
+        'product_photos_qty': 1 + rng.poisson(1.2, n_products),
+        'product_weight_g': np.clip(rng.lognormal(np.log(700), 1.1, n_products), 50, 40425).round(),
+        'product_length_cm': rng.integers(7, 106, n_products),
+        'product_height_cm': rng.integers(2, 106, n_products),
+        'product_width_cm': rng.integers(6, 119, n_products)
+    }))
+
+    writer.write('category_translations', pd.DataFrame(
+        [(name, english) for name, english, _ in CATEGORIES],
+        columns=['product_category_name', 'product_category_name_english']
+    ))
+    return product_ids, product_price, seller_ids[product_seller]
+
+
+def generate_orders_block(rng, n, product_ids, product_price, product_seller, writer):
+    """Customers, orders, items, payments and reviews for n orders"""
+    # One customer_id per order; ~3% of orders come from a returning buyer
+    customer_ids = _hex_ids(rng, n)
+    unique_ids = _hex_ids(rng, n)
+    returning = np.flatnonzero(rng.random(n) < 0.03)
+    unique_ids[returning] = unique_ids[rng.integers(0, n, returning.size)]
+    _, states, zips, cities = _state_columns(rng, n, 1)
+    writer.write('customers', pd.DataFrame({
+        'customer_id': customer_ids,
+        'customer_unique_id': unique_ids,
+        'customer_zip_code_prefix': zips,
+        'customer_city': cities,
+        'customer_state': states
+    }))
+
+    order_ids = _hex_ids(rng, n)
+    statuses = rng.choice(list(ORDER_STATUSES), size=n, p=_weights(list(ORDER_STATUSES.values())))
+    purchased = _purchase_times(rng, n)
+    seconds = lambda low, high: (rng.uniform(low, high, n) * 86400).astype('int64').astype('timedelta64[s]')
+    approved = purchased + seconds(0.01, 2)
+    carrier = approved + seconds(1, 5)
+    delivered = carrier + seconds(2, 20)
+    estimated = (purchased + seconds(15, 35)).astype('datetime64[D]').astype('datetime64[s]')
+    not_approved = np.isin(statuses, ['created', 'canceled', 'unavailable']) & (rng.random(n) < 0.8)
+    not_shipped = ~np.isin(statuses, ['delivered', 'shipped'])
+    not_delivered = statuses != 'delivered'
+    nat = np.datetime64('NaT')
+    approved = np.where(not_approved, nat, approved)
+    carrier = np.where(not_shipped, nat, carrier)
+    delivered = np.where(not_delivered, nat, delivered)
+    writer.write('orders', pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customer_ids,
+        'order_status': statuses,
+        'order_purchase_timestamp': _format_dates(purchased),
+        'order_approved_at': _format_dates(approved),
+        'order_delivered_carrier_date': _format_dates(carrier),
+        'order_delivered_customer_date': _format_dates(delivered),
+        'order_estimated_delivery_date': _format_dates(estimated)
+    }))
+
+    # Items: unavailable and just-created orders have none
+    item_counts = rng.choice(list(ITEMS_PER_ORDER), size=n, p=_weights(list(ITEMS_PER_ORDER.values())))
+    item_counts[np.isin(statuses, ['unavailable', 'created'])] = 0
+    item_order = np.repeat(np.arange(n), item_counts)
+    item_seq = np.arange(item_order.size) - np.repeat(np.cumsum(item_counts) - item_counts, item_counts) + 1
+    # Extra units of the same product are extra rows, as in Olist
+    first_product = rng.integers(0, product_ids.size, n)
+    same_product = rng.random(item_order.size) < 0.6
+    item_product = np.where(
+        (item_seq == 1) | same_product,
+        first_product[item_order],
+        rng.integers(0, product_ids.size, item_order.size)
+    )
+    price = product_price[item_product]
+    freight = np.clip(rng.lognormal(np.log(16), 0.5, item_order.size), 0, 409).round(2)
+    writer.write('order_items', pd.DataFrame({
+        'order_id': order_ids[item_order],
+        'order_item_id': item_seq,
+        'product_id': product_ids[item_product],
+        'seller_id': product_seller[item_product],
+        'shipping_limit_date': _format_dates(purchased[item_order] + np.timedelta64(6, 'D')),
+        'price': price,
+        'freight_value': freight
+    }))
+
+    # Payments cover items plus freight; ~3% of orders split a voucher off
+    order_total = np.bincount(item_order, weights=price + freight, minlength=n)
+    order_total = np.where(item_counts == 0, rng.lognormal(np.log(100), 0.8, n), order_total).round(2)
+    pay_type = rng.choice(list(PAYMENT_TYPES), size=n, p=_weights(list(PAYMENT_TYPES.values())))
+    installments = np.where(
+        pay_type == 'credit_card',
+        rng.choice(list(INSTALLMENTS), size=n, p=_weights(list(INSTALLMENTS.values()))),
+        1
+    )
+    split = rng.random(n) < 0.03
+    voucher_value = (order_total * rng.uniform(0.1, 0.5, n)).round(2)
+    first_value = np.where(split, order_total - voucher_value, order_total)
+    split_idx = np.flatnonzero(split)
+    payments = pd.DataFrame({
+        'order_id': np.concatenate([order_ids, order_ids[split_idx]]),
+        'payment_sequential': np.concatenate([np.ones(n, dtype='int64'), np.full(split_idx.size, 2)]),
+        'payment_type': np.concatenate([pay_type, np.full(split_idx.size, 'voucher')]),
+        'payment_installments': np.concatenate([installments, np.ones(split_idx.size, dtype='int64')]),
+        'payment_value': np.concatenate([first_value, voucher_value[split_idx]])
+    })
+    writer.write('order_payments', payments.sort_values(['order_id', 'payment_sequential'], kind='stable'))
+
+    # Reviews: ~99% of orders, scores depend on whether delivery was late
+    reviewed = np.flatnonzero(rng.random(n) < 0.992)
+    late = (delivered > estimated + np.timedelta64(1, 'D'))[reviewed]
+    undelivered = not_delivered[reviewed]
+    scores = np.where(
+        undelivered,
+        rng.choice(5, size=reviewed.size, p=_weights(REVIEW_SCORES_UNDELIVERED)),
+        np.where(
+            late,
+            rng.choice(5, size=reviewed.size, p=_weights(REVIEW_SCORES_LATE)),
+            rng.choice(5, size=reviewed.size, p=_weights(REVIEW_SCORES_ON_TIME))
+        )
+    ) + 1
+    created = np.where(undelivered, estimated[reviewed], delivered[reviewed]).astype('datetime64[D]').astype('datetime64[s]')
+    created = created + np.timedelta64(1, 'D')
+    answered = created + (rng.uniform(0.2, 3, reviewed.size) * 86400).astype('int64').astype('timedelta64[s]')
+    titles = np.where(rng.random(reviewed.size) < 0.12, rng.choice(REVIEW_TITLES, reviewed.size), '')
+    messages = np.where(rng.random(reviewed.size) < 0.41, rng.choice(REVIEW_MESSAGES, reviewed.size), '')
+    writer.write('order_reviews', pd.DataFrame({
+        'review_id': _hex_ids(rng, reviewed.size),
+        'order_id': order_ids[reviewed],
+        'review_score': scores,
+        'review_comment_title': titles,
+        'review_comment_message': messages,
+        'review_creation_date': _format_dates(created),
+        'review_answer_timestamp': _format_dates(answered)
+    }))
+
+
+def generate_geolocation(rng, n, writer):
+    """Zip prefix lookup rows scattered around each state's capital"""
+    for start in range(0, n, BLOCK_ORDERS):
+        size = min(BLOCK_ORDERS, n - start)
+        state_idx, states, zips, cities = _state_columns(rng, size, 1)
+        lat = np.array([s[5] for s in STATES])[state_idx] + rng.normal(0, 0.8, size)
+        lng = np.array([s[6] for s in STATES])[state_idx] + rng.normal(0, 0.8, size)
+        writer.write('geolocation', pd.DataFrame({
+            'geolocation_zip_code_prefix': zips,
+            'geolocation_lat': lat.round(6),
+            'geolocation_lng': lng.round(6),
+            'geolocation_city': cities,
+            'geolocation_state': states
+        }))
+
+
+def generate_dataset(out_dir, scale=1.0, seed=0):
+    """Write every table to out_dir and return the row count per table"""
+    os.makedirs(out_dir, exist_ok=True)
+    writer = _CsvWriter(out_dir)
+    # Independent streams per part, so each part is reproducible on its own
+    catalogue = generate_catalogue(np.random.default_rng([seed, 0]), scale, writer)
+
+    n_orders = max(1, round(BASE_ORDERS * scale))
+    for block, start in enumerate(range(0, n_orders, BLOCK_ORDERS)):
+        rng = np.random.default_rng([seed, 1, block])
+        generate_orders_block(rng, min(BLOCK_ORDERS, n_orders - start), *catalogue, writer)
+
+    n_geolocation = max(1, round(BASE_GEOLOCATION * min(scale, 1.0)))
+    generate_geolocation(np.random.default_rng([seed, 2]), n_geolocation, writer)
+
+    missing = set(CSV_FILE_IDS) - set(writer.rows)
+    assert not missing, f"tables not generated: {missing}"
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Olist-shaped dataset")
+    parser.add_argument('--scale', type=float, default=1.0, help="1 = public dataset size (e.g. 0.1, 10, 100)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='data/synthetic', help="output directory for the CSV files")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = generate_dataset(args.out, scale=args.scale, seed=args.seed)
+    for table_name, count in rows.items():
+        print(f"{table_name:<22} {count:>12,} rows")
+    print(f"Wrote {len(rows)} tables to {args.out} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
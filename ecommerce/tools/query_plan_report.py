@@ -0,0 +1,109 @@
+"""
+Standalone EXPLAIN QUERY PLAN report over every get_* section query
+
+Run from the ecommerce/ directory:
+    python -m tools.query_plan_report [--db ecommerce.db] [--verbose]
+
+Each get_* function is called with the result cache cleared, so the timings
+are real executions: once on the default mv_ path and once per filter variant
+below, which is what exercises the fact_orders and base-table indexes. Exits with status 1 when a query does a full
+scan or builds a temporary B-tree outside the small summary tables.
+"""
+import argparse
+import datetime
+import importlib
+import inspect
+import pkgutil
+import sqlite3
+import sys
+
+import components
+from utils.filters import DashboardFilters
+from utils.perf import perf
+from utils.query_cache import query_cache
+from utils.query_plan import format_plan
+
+# Sidebar selections each filterable get_* is also explained with. "All
+# statuses" on its own reads every order, so its full scans are expected.
+FILTER_VARIANTS = {
+    'state': DashboardFilters(states=('SP', 'RJ')),
+    'date range': DashboardFilters(start_date=datetime.date(2017, 3, 1), end_date=datetime.date(2017, 8, 31)),
+    'all statuses': DashboardFilters(statuses=()),
+    'all statuses, date range': DashboardFilters(
+        start_date=datetime.date(2017, 3, 1), end_date=datetime.date(2017, 8, 31), statuses=()
+    ),
+}
+
+
+def iter_query_functions():
+    """(module name, function) for every get_* defined in components/"""
+    for module_info in pkgutil.iter_modules(components.__path__):
+        module = importlib.import_module(f"components.{module_info.name}")
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if name.startswith('get_') and func.__module__ == module.__name__:
+                yield module_info.name, func
+
+
+def iter_query_calls():
+    """(section name, function, kwargs): every get_* unfiltered, then per filter variant"""
+    for module_name, func in iter_query_functions():
+        section = f"{module_name}.{func.__name__}"
+        yield section, func, {}
+        if 'filters' in inspect.signature(func).parameters:
+            for variant, filters in FILTER_VARIANTS.items():
+                yield f"{section}[{variant}]", func, {'filters': filters}
+
+
+def collect_plans(conn):
+    """Run every get_* call in diagnostic mode and return its SQL events"""
+    perf.explain = True
+    results = []
+    for section, func, kwargs in iter_query_calls():
+        query_cache.clear()
+        with perf.section(section):
+            func(conn, **kwargs)
+        events = [event for event in perf.last_run(section)['events'] if event['kind'] == 'sql']
+        if _selects_every_order(kwargs.get('filters')):
+            for event in events:
+                for issue in event['plan_issues']:
+                    issue['expected'] = True
+        results.append((section, events))
+    return results
+
+
+def _selects_every_order(filters):
+    return filters is not None and filters.where()[0] == '1'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='ecommerce.db', help="SQLite database to inspect")
+    parser.add_argument('--verbose', action='store_true', help="print every plan, not only flagged ones")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    try:
+        results = collect_plans(conn)
+    finally:
+        conn.close()
+
+    flagged = 0
+    for section, events in results:
+        for event in events:
+            unexpected = [issue for issue in event['plan_issues'] if not issue['expected']]
+            flagged += bool(unexpected)
+            status = "FLAG" if unexpected else "ok"
+            print(f"[{status:>4}] {section}: {event['seconds'] * 1000:.2f} ms, {event['rows']} rows")
+            if unexpected or args.verbose:
+                print('\n'.join('         ' + line for line in format_plan(event['plan']).splitlines()))
+            for issue in event['plan_issues']:
+                note = "expected" if issue['expected'] else "needs an index"
+                if not issue['expected'] or args.verbose:
+                    print(f"         - {issue['kind']}: {issue['detail']} ({note})")
+
+    print(f"\n{len(results)} query calls, {flagged} flagged")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
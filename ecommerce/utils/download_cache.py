@@ -0,0 +1,227 @@
+"""
+Persistent on-disk cache for raw CSV downloads with conditional revalidation
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, replace
+
+from config.gdrive_config import DOWNLOAD_CACHE_DIR, DOWNLOAD_CACHE_TTL, DOWNLOAD_TIMEOUT
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachedFile:
+    """A cached download: local path plus the metadata stored with it"""
+    url: str
+    path: str
+    sha256: str
+    size: int
+    etag: str = None
+    last_modified: str = None
+    fetched_at: float = 0.0
+    status: str = 'downloaded'  # downloaded | revalidated | fresh | offline | local
+
+
+class DownloadCache:
+    """Content-addressed cache for downloaded files.
+
+    Bytes live in ``objects/<sha256>`` and each URL has a small JSON entry in
+    ``entries/`` with its ETag, Last-Modified, size, SHA-256 and fetch time.
+    Entries younger than ``ttl`` seconds are served without touching the
+    network; older ones are revalidated with a conditional GET, and the cached
+    copy is used when the server cannot be reached. Local paths (and file://
+    URLs) are read in place; only their hash is remembered, keyed on size and
+    modification time.
+    """
+
+    def __init__(self, cache_dir=DOWNLOAD_CACHE_DIR, ttl=DOWNLOAD_CACHE_TTL, timeout=DOWNLOAD_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.timeout = timeout
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.entries_dir = os.path.join(cache_dir, 'entries')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.entries_dir, exist_ok=True)
+
+    def fetch(self, url):
+        """Return a CachedFile for url, downloading only when needed"""
+        path = local_path(url)
+        if path is not None:
+            return self._fetch_local(url, path)
+
+        cached = self._read_entry(url)
+        if cached and self.ttl and time.time() - cached.fetched_at < self.ttl:
+            return replace(cached, status='fresh')
+
+        request = urllib.request.Request(url)
+        if cached:
+            if cached.etag:
+                request.add_header('If-None-Match', cached.etag)
+            if cached.last_modified:
+                request.add_header('If-Modified-Since', cached.last_modified)
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return self._store(url, response, previous=cached)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached:
+                entry = replace(cached, fetched_at=time.time(), status='revalidated')
+                self._write_entry(entry)
+                return entry
+            if cached and e.code >= 500:
+                return replace(cached, status='offline')
+            raise
+        except (urllib.error.URLError, OSError):
+            # Network unreachable: fall back to the last good copy
+            if cached:
+                return replace(cached, status='offline')
+            raise
+
+    def clear(self):
+        """Remove every cached entry and object"""
+        for directory in (self.entries_dir, self.objects_dir):
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+
+    def _store(self, url, response, previous=None):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    block = response.read(CHUNK_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    size += len(block)
+                    f.write(block)
+            # read(amt) does not raise on a connection dropped mid-body
+            expected = response.headers.get('Content-Length')
+            if expected is not None and size != int(expected):
+                raise urllib.error.ContentTooShortError(
+                    f"{url}: got {size} of {expected} bytes", None
+                )
+            sha256 = digest.hexdigest()
+            object_path = self._object_path(sha256)
+            os.replace(tmp_path, object_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        entry = CachedFile(
+            url=url,
+            path=object_path,
+            sha256=sha256,
+            size=size,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            fetched_at=time.time(),
+            status='downloaded'
+        )
+        self._write_entry(entry)
+        if previous and previous.sha256 != sha256:
+            self._release(previous.sha256)
+        return entry
+
+    def _fetch_local(self, url, path):
+        """Hash a local file, reusing the stored hash while it is unchanged"""
+        stat = os.stat(path)
+        try:
+            with open(self._entry_path(url), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns:
+            sha256 = meta['sha256']
+        else:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(block)
+            sha256 = digest.hexdigest()
+            meta = {'url': url, 'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            entry_path = self._entry_path(url)
+            with open(entry_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(entry_path + '.tmp', entry_path)
+        return CachedFile(
+            url=url,
+            path=path,
+            sha256=sha256,
+            size=stat.st_size,
+            fetched_at=time.time(),
+            status='local'
+        )
+
+    def _release(self, sha256):
+        """Delete an object once no entry references it any more"""
+        for name in os.listdir(self.entries_dir):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(self.entries_dir, name), encoding='utf-8') as f:
+                if json.load(f).get('sha256') == sha256:
+                    return
+        object_path = self._object_path(sha256)
+        if os.path.exists(object_path):
+            os.remove(object_path)
+
+    def _entry_path(self, url):
+        return os.path.join(self.entries_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256)
+
+    def _read_entry(self, url):
+        try:
+            with open(self._entry_path(url), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = self._object_path(meta['sha256'])
+        # Discard entries whose object went missing or was truncated
+        if not os.path.exists(path) or os.path.getsize(path) != meta['size']:
+            return None
+        return CachedFile(
+            url=url,
+            path=path,
+            sha256=meta['sha256'],
+            size=meta['size'],
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+            fetched_at=meta.get('fetched_at', 0.0),
+            status='fresh'
+        )
+
+    def _write_entry(self, entry):
+        meta = {
+            'url': entry.url,
+            'sha256': entry.sha256,
+            'size': entry.size,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'fetched_at': entry.fetched_at
+        }
+        entry_path = self._entry_path(entry.url)
+        tmp_path = entry_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, entry_path)
+
+
+def local_path(url):
+    """Filesystem path for a local source (plain path or file:// URL), else None"""
+    if os.path.exists(url):
+        return url
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == 'file':
+        return urllib.request.url2pathname(parsed.path)
+    return None
@@ -0,0 +1,62 @@
+"""
+Cache of built Plotly figures, keyed on the chart, its input data and widget values
+"""
+import hashlib
+
+import pandas as pd
+
+from config.performance_config import FIGURE_CACHE_MAX_BYTES
+from utils.perf import perf
+from utils.query_cache import QueryCache
+
+
+# A built go.Figure holds far more than its JSON: validators and property
+# objects for every trace and layout node. Measured with tracemalloc on the
+# app's nine figures (69-186 KB each, 5-20 KB of JSON), 8x the JSON plus
+# 40 KB lands within 10% of the real size.
+FIGURE_BYTES_PER_JSON_BYTE = 8
+FIGURE_BASE_BYTES = 40 * 1024
+
+
+def _frames(data):
+    return data if isinstance(data, (list, tuple)) else [data]
+
+
+def data_fingerprint(data):
+    """Content hash of one DataFrame or a list of them"""
+    digest = hashlib.sha1()
+    for df in _frames(data):
+        digest.update(repr(list(df.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def figure_bytes(fig):
+    """Cache size charged for a built figure, scaled from its serialized size.
+
+    Serializing costs a few milliseconds, paid once per cache miss on top of
+    a build that takes much longer.
+    """
+    return len(fig.to_json()) * FIGURE_BYTES_PER_JSON_BYTE + FIGURE_BASE_BYTES
+
+
+# Same byte-bounded LRU as the query results, sized for figures.
+# Shared by every session of the app; cached figures must not be modified.
+figure_cache = QueryCache(max_bytes=FIGURE_CACHE_MAX_BYTES)
+
+
+def cached_figure(name, data, build, **params):
+    """Return the figure build() makes for this data and widget values.
+
+    The figure is rebuilt only when the data (by content) or one of the
+    keyword params changes, so switching back to a section or rerunning it
+    with the same inputs skips the Plotly construction entirely.
+    """
+    key = ('figure', name, data_fingerprint(data), tuple(sorted(params.items())))
+
+    def timed_build():
+        # The whole builder (px calls, traces, layout) counts as the figure build
+        with perf.timed('figure', name):
+            return build()
+
+    return figure_cache.get_or_compute(key, timed_build, figure_bytes)
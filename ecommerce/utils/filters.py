@@ -0,0 +1,74 @@
+"""
+Global dashboard filters and the SQL predicate they push into section queries
+"""
+import calendar
+import datetime
+from dataclasses import dataclass
+
+# Order statuses the dashboard shows when the user has not chosen any others;
+# the mv_ summary tables are precomputed for exactly this selection
+DEFAULT_STATUSES = ('delivered',)
+
+
+def _epoch(day):
+    # Timestamps are stored as naive Unix epoch seconds (see DataLoader._chunk_rows)
+    return calendar.timegm(day.timetuple())
+
+
+@dataclass(frozen=True)
+class DashboardFilters:
+    """Purchase date range, customer states and order statuses.
+
+    None dates are unbounded and an empty tuple means "all". The defaults
+    select every delivered order, which the mv_ tables already summarize.
+    """
+    start_date: datetime.date = None
+    end_date: datetime.date = None
+    states: tuple = ()
+    statuses: tuple = DEFAULT_STATUSES
+
+    def is_default(self):
+        return self == DashboardFilters()
+
+    def where(self, alias='f'):
+        """SQL predicate over fact_orders and its bound parameters.
+
+        Every condition is on an indexed column: order_status and
+        purchase_month lead idx_fact_orders_order_status_purchase_month, and
+        customer_state leads the state index. The exact day bounds on
+        order_purchase_timestamp are checked on the rows those ranges select.
+        """
+        prefix = f"{alias}." if alias else ''
+        clauses, params = [], []
+        if self.statuses:
+            clauses.append(f"{prefix}order_status IN ({', '.join('?' * len(self.statuses))})")
+            params.extend(self.statuses)
+        if self.states:
+            clauses.append(f"{prefix}customer_state IN ({', '.join('?' * len(self.states))})")
+            params.extend(self.states)
+        if self.start_date is not None:
+            clauses.append(f"{prefix}purchase_month >= ?")
+            params.append(self.start_date.year * 100 + self.start_date.month)
+            clauses.append(f"{prefix}order_purchase_timestamp >= ?")
+            params.append(_epoch(self.start_date))
+        if self.end_date is not None:
+            clauses.append(f"{prefix}purchase_month <= ?")
+            params.append(self.end_date.year * 100 + self.end_date.month)
+            clauses.append(f"{prefix}order_purchase_timestamp < ?")
+            params.append(_epoch(self.end_date + datetime.timedelta(days=1)))
+        return ' AND '.join(clauses) or '1', params
+
+    def describe(self):
+        """Short human-readable summary for captions"""
+        parts = []
+        if self.start_date is not None or self.end_date is not None:
+            parts.append(f"{self.start_date or '…'} → {self.end_date or '…'}")
+        if self.states:
+            parts.append(', '.join(self.states))
+        parts.append(', '.join(self.statuses) if self.statuses else 'all statuses')
+        return ' | '.join(parts)
+
+
+def uses_summary_tables(filters):
+    """True when a section can read its precomputed mv_ table as-is"""
+    return filters is None or filters.is_default()
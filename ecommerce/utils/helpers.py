@@ -3,7 +3,11 @@ Helper functions for the dashboard with Viridis Theme - CORREGIDO
 """
 import plotly.graph_objects as go
 import plotly.express as px
+import functools
 import pandas as pd
+import streamlit as st
+from plotly.subplots import make_subplots
+from utils.perf import perf
 
 # Viridis color scale
 VIRIDIS_COLORS = px.colors.sequential.Viridis
@@ -64,6 +68,31 @@ def apply_viridis_style(fig, title=None, height=1000, width=None):
     
     return fig
 
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart, timed as a chart render"""
+    title = fig.layout.title.text or 'plotly_chart'
+    with perf.timed('chart', title) as event:
+        event['rows'] = len(fig.data)  # traces drawn
+        st.plotly_chart(fig, **kwargs)
+
+def fragment(func):
+    """Run func as an st.fragment: its widgets rerun only func, not the whole app.
+
+    st.fragment is looked up on each call so a stubbed st still runs func.
+    Fragment-only reruns are timed as their own perf section.
+    """
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        if perf.current_section() is not None:
+            return func(*args, **kwargs)
+        with perf.section(f"{func.__name__} (fragment)"):
+            return func(*args, **kwargs)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return st.fragment(timed)(*args, **kwargs)
+    return wrapper
+
 def get_viridis_color(index, total_items):
     """Get Viridis color based on index - CORREGIDO manejo de división por cero"""
     if total_items <= 1:
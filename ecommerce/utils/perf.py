@@ -0,0 +1,156 @@
+"""
+Lightweight timing instrumentation for sections, SQL, figure builds and charts
+"""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from config.performance_config import PERF_ENABLED, PERF_WINDOW, EXPLAIN_QUERIES
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q between 0 and 100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class PerfRecorder:
+    """Thread-safe collector of timings grouped by dashboard section.
+
+    ``section()`` times one render of a section and collects the operations
+    timed inside it with ``timed()`` on the same thread. Only the last
+    ``window`` samples are kept, so percentiles follow recent behaviour.
+    With ``explain`` on, SQL events also carry their query plan.
+    """
+
+    def __init__(self, window=PERF_WINDOW, enabled=PERF_ENABLED, explain=EXPLAIN_QUERIES):
+        self.window = window
+        self.enabled = enabled
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._runs = defaultdict(lambda: deque(maxlen=self.window))  # section -> seconds
+        self._ops = defaultdict(lambda: deque(maxlen=self.window))   # (section, kind, label) -> seconds
+        self._last_event = {}                                        # (section, kind, label) -> event
+        self._last_run = {}                                          # section -> events
+
+    def current_section(self):
+        return getattr(self._local, 'section', None)
+
+    @contextmanager
+    def section(self, name):
+        """Time one render of a section and everything timed inside it"""
+        if not self.enabled:
+            yield
+            return
+        previous = (self.current_section(), getattr(self._local, 'events', None))
+        events = []
+        self._local.section, self._local.events = name, events
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._local.section, self._local.events = previous
+            with self._lock:
+                self._runs[name].append(seconds)
+                self._last_run[name] = {'seconds': seconds, 'events': events}
+
+    @contextmanager
+    def timed(self, kind, label):
+        """Time one operation; the yielded dict accepts 'rows', 'bytes' and 'plan'"""
+        event = {'kind': kind, 'label': label, 'seconds': None, 'rows': None, 'bytes': None}
+        if not self.enabled:
+            yield event
+            return
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            event['seconds'] = time.perf_counter() - start
+            section = self.current_section()
+            events = getattr(self._local, 'events', None)
+            if events is not None:
+                events.append(event)
+            key = (section, kind, label)
+            with self._lock:
+                self._ops[key].append(event['seconds'])
+                self._last_event[key] = event
+
+    def instrument(self, kind, label=None):
+        """Decorator that times every call of a function"""
+        def decorator(func):
+            name = label or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timed(kind, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def section_summary(self):
+        """One row per section: runs, rolling p50/p95 and last duration (ms)"""
+        with self._lock:
+            runs = {name: list(samples) for name, samples in self._runs.items()}
+        return [
+            {
+                'section': name,
+                'runs': len(samples),
+                'p50_ms': _ms(percentile(samples, 50)),
+                'p95_ms': _ms(percentile(samples, 95)),
+                'last_ms': _ms(samples[-1])
+            }
+            for name, samples in runs.items()
+        ]
+
+    def operation_summary(self, section=None):
+        """One row per timed operation, optionally limited to one section"""
+        with self._lock:
+            ops = {key: list(samples) for key, samples in self._ops.items()}
+            last = dict(self._last_event)
+        rows = []
+        for key, samples in ops.items():
+            op_section, kind, label = key
+            if section is not None and op_section != section:
+                continue
+            rows.append({
+                'section': op_section,
+                'kind': kind,
+                'label': label,
+                'calls': len(samples),
+                'p50_ms': _ms(percentile(samples, 50)),
+                'p95_ms': _ms(percentile(samples, 95)),
+                'rows': last[key]['rows'],
+                'bytes': last[key]['bytes'],
+                'plan_flags': '; '.join(
+                    issue['detail'] for issue in last[key].get('plan_issues', ()) if not issue['expected']
+                ) or None
+            })
+        return rows
+
+    def last_run(self, section):
+        """Duration and operation breakdown of the most recent render of a section"""
+        with self._lock:
+            return self._last_run.get(section)
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+            self._ops.clear()
+            self._last_event.clear()
+            self._last_run.clear()
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+# Shared by every session of the app
+perf = PerfRecorder()
@@ -0,0 +1,142 @@
+"""
+Background prefetch of the section queries the user has not opened yet
+"""
+import inspect
+import logging
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from config.performance_config import PREFETCH_WORKERS
+from utils.perf import perf
+from utils.query_cache import get_generation
+
+logger = logging.getLogger(__name__)
+
+def section_queries(show_function):
+    """The get_* functions defined next to a show_* function"""
+    module = sys.modules[show_function.__module__]
+    return [
+        func for name, func in inspect.getmembers(module, inspect.isfunction)
+        if name.startswith('get_') and func.__module__ == module.__name__
+    ]
+
+
+# Scheduled (query, filters) pairs remembered before finished ones are dropped
+MAX_TRACKED = 256
+
+
+class Prefetcher:
+    """Runs get_* queries on a bounded thread pool to fill the shared result cache.
+
+    Each query is scheduled at most once per database generation and set of
+    filters. When the
+    generation changes, queued work for the old one is cancelled and any task
+    that still starts for it returns without querying.
+    """
+
+    def __init__(self, max_workers=PREFETCH_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._generation = None
+        self._scheduled = {}  # (get_* function, filters) -> future, for the current generation
+        self._stats = {'scheduled': 0, 'completed': 0, 'cancelled': 0, 'stale': 0, 'failed': 0}
+
+    def schedule(self, loader, show_functions, filters=None):
+        """Queue the queries behind show_functions that are not done or pending"""
+        conn = loader.get_connection()
+        try:
+            generation = get_generation(conn)
+        finally:
+            loader.release_connection(conn)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='prefetch')
+            if generation != self._generation:
+                self._cancel_locked()
+                self._generation = generation
+            if len(self._scheduled) > MAX_TRACKED:
+                self._forget_done_locked()
+            for show_function in show_functions:
+                for func in section_queries(show_function):
+                    key = (func, filters)
+                    if key in self._scheduled:
+                        continue
+                    self._scheduled[key] = self._executor.submit(self._run, loader, key, generation)
+                    self._stats['scheduled'] += 1
+
+    def _cancel_locked(self):
+        for future in self._scheduled.values():
+            if future.cancel():
+                self._stats['cancelled'] += 1
+        self._scheduled.clear()
+
+    def _forget_done_locked(self):
+        # Finished filter combinations are cheap to redo: the result cache has them
+        for key in [key for key, future in self._scheduled.items() if future.done()]:
+            del self._scheduled[key]
+
+    def _is_stale(self, generation):
+        with self._lock:
+            return generation != self._generation
+
+    def _run(self, loader, key, generation):
+        func, filters = key
+        if self._is_stale(generation):
+            self._count('stale')
+            return
+        conn = None
+        completed = False
+        try:
+            conn = loader.get_connection()
+            # The pool may already hand out a newer snapshot
+            if get_generation(conn) != generation:
+                self._count('stale')
+                return
+            with perf.section('prefetch'):
+                func(conn, filters)
+            self._count('completed')
+            completed = True
+        except (sqlite3.Error, pd.errors.DatabaseError):
+            # The section reports the error itself when it is opened
+            self._count('failed')
+        except Exception:
+            # Nobody reads the future's result, so log it here
+            logger.exception("Prefetch of %s failed", func.__qualname__)
+            self._count('failed')
+        finally:
+            if conn is not None:
+                loader.release_connection(conn)
+            # Anything but a completed query may be retried by the next schedule()
+            if not completed:
+                with self._lock:
+                    if self._generation == generation:
+                        self._scheduled.pop(key, None)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def cancel(self):
+        """Drop queued work, e.g. before the database is rebuilt"""
+        with self._lock:
+            self._cancel_locked()
+            self._generation = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(
+                workers=self.max_workers,
+                pending=sum(not future.done() for future in self._scheduled.values())
+            )
+            return stats
+
+
+# Shared by every session of the app
+prefetcher = Prefetcher()
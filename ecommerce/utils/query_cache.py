@@ -0,0 +1,137 @@
+"""
+Result cache for section queries, keyed on the database snapshot generation
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from config.performance_config import QUERY_CACHE_MAX_BYTES
+from utils.perf import perf
+from utils.query_plan import explain, find_issues, table_names
+
+
+def get_generation(conn):
+    """Identify the database snapshot a connection reads.
+
+    The loader bumps PRAGMA user_version every time it publishes a rebuilt
+    database, so (file, user_version) changes whenever the data does.
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    return db_file, user_version
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results bounded by a byte budget.
+
+    Keys combine the SQL text, its parameters and the database generation,
+    so a rebuilt database never serves stale results.
+    """
+
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, size_of):
+        """Return the cached value for key, computing and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = size_of(value)
+        if size <= self.max_bytes:
+            with self._lock:
+                if key in self._entries:
+                    self._bytes -= self._entries.pop(key)[1]
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._bytes -= evicted_size
+                    self.evictions += 1
+        return value
+
+    def read_sql(self, conn, query, params=()):
+        """Cached pd.read_sql_query; returns a copy the caller may modify"""
+        key = ('read_sql', get_generation(conn), query, tuple(params))
+        df = self.get_or_compute(
+            key,
+            lambda: pd.read_sql_query(query, conn, params=tuple(params)),
+            lambda result: int(result.memory_usage(index=True, deep=True).sum()) + len(query)
+        )
+        return df.copy()
+
+    def fetch_one(self, conn, query, params=()):
+        """Cached cursor.fetchone() for single-row queries"""
+        key = ('fetch_one', get_generation(conn), query, tuple(params))
+        return self.get_or_compute(
+            key,
+            lambda: conn.execute(query, tuple(params)).fetchone(),
+            lambda row: sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row or ()) + len(query)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+# Shared by every session of the app
+query_cache = QueryCache()
+
+
+def _caller_name():
+    # The get_* function that issued the query labels its timing
+    return sys._getframe(2).f_code.co_name
+
+
+def _attach_plan(event, conn, query, params):
+    # Diagnostic mode: store the plan with the timing, outside the timed block
+    if perf.explain:
+        event['plan'] = explain(conn, query, params)
+        event['plan_issues'] = find_issues(event['plan'], table_names(conn), query)
+
+
+def read_sql(conn, query, params=()):
+    """Run a section query through the shared result cache"""
+    with perf.timed('sql', _caller_name()) as event:
+        df = query_cache.read_sql(conn, query, params)
+        event['rows'] = len(df)
+        event['bytes'] = int(df.memory_usage(index=True).sum())
+    _attach_plan(event, conn, query, params)
+    return df
+
+
+def fetch_one(conn, query, params=()):
+    """Run a single-row query through the shared result cache"""
+    with perf.timed('sql', _caller_name()) as event:
+        row = query_cache.fetch_one(conn, query, params)
+        event['rows'] = 0 if row is None else 1
+        event['bytes'] = sum(sys.getsizeof(value) for value in row or ())
+    _attach_plan(event, conn, query, params)
+    return row
@@ -0,0 +1,88 @@
+"""
+EXPLAIN QUERY PLAN capture and detection of full scans and temporary B-trees
+"""
+import re
+
+from config.performance_config import EXPLAIN_SCAN_OK_PREFIXES
+
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?')
+_INDEX_SCAN = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+# FROM/JOIN <table> [AS] <alias>; subqueries ("FROM (SELECT ...) d") do not match
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?(\w+)"?)?', re.IGNORECASE)
+_NOT_ALIASES = {
+    'where', 'join', 'left', 'right', 'inner', 'outer', 'cross', 'natural', 'on', 'using',
+    'group', 'order', 'having', 'limit', 'union', 'except', 'intersect', 'window', 'as'
+}
+_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+
+
+def explain(conn, query, params=()):
+    """Plan steps of a query as (id, parent, detail) tuples"""
+    return [
+        (row[0], row[1], row[3])
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", tuple(params))
+    ]
+
+
+def table_names(conn):
+    """Names of the real tables, to tell them apart from CTE and subquery scans"""
+    return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def table_aliases(query, tables):
+    """{name used in the plan: table} for the real tables a query reads.
+
+    SQLite 3.36+ prints the alias in plan rows ("SCAN f"), so aliases are
+    resolved from the FROM and JOIN clauses; CTE and subquery names are left
+    out since they are not in ``tables``.
+    """
+    aliases = {table: table for table in tables}
+    for table, alias in _TABLE_REF.findall(query or ''):
+        if table in tables and alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def find_issues(plan, tables, query=None, scan_ok_prefixes=EXPLAIN_SCAN_OK_PREFIXES):
+    """Flag full table scans, full index scans and temporary B-trees in a plan.
+
+    Returns a list of dicts with the plan detail and whether it is expected:
+    scans of small summary tables are, anything else should search an index,
+    and a temporary B-tree is only flagged on top of an unexpected scan. A
+    scan through an index ("SCAN f USING COVERING INDEX ...") still reads
+    every entry and counts as a full index scan. Scans are resolved to tables through the aliases in ``query``;
+    scans of CTEs and subqueries the plan already computed are not flagged.
+    """
+    aliases = table_aliases(query, tables)
+    issues = []
+    for _, _, detail in plan:
+        match = _SCAN.match(detail)
+        table = match and aliases.get(match.group(2) or match.group(1))
+        if table:
+            index = _INDEX_SCAN.search(detail)
+            issues.append({
+                'detail': detail,
+                'kind': f"full index scan ({index.group(1)})" if index else 'full scan',
+                'expected': table.startswith(tuple(scan_ok_prefixes))
+            })
+    # Sorting or grouping the rows an index selected is fine
+    only_small_scans = all(issue['expected'] for issue in issues)
+    for _, _, detail in plan:
+        match = _TEMP_BTREE.search(detail)
+        if match:
+            issues.append({
+                'detail': detail,
+                'kind': f"temp b-tree ({match.group(1).lower()})",
+                'expected': only_small_scans
+            })
+    return issues
+
+
+def format_plan(plan):
+    """Indented text rendering of a plan, like the sqlite3 shell"""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, detail in plan:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return '\n'.join(lines)